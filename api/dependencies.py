@@ -1,26 +1,119 @@
 # api/dependencies.py
-from functools import lru_cache
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from functools import lru_cache, wraps
 from core.config import config
-from data_access.vector_store import MilvusVectorStore, VectorStore
+from core.inference import import_model_libraries, load_embeddings
+from core.metrics import registry
+from core.readiness import components
+from data_access.bm25_index import BM25Index
+from data_access.embedding_cache import CachedEmbeddings
+from data_access.vector_store import VectorStore, create_vector_store
+from core.ingestion_jobs import IngestionJobQueue
 from core.ingestion_service import IngestionService
 from core.rag_service import RAGService
 
+# Serializes first loads: a request arriving during warm-up waits for the component
+# instead of loading a second copy of the model
+_load_lock = threading.RLock()
+
+def component(name: str):
+    """lru_cache singleton whose first load is serialized and reported on /ready."""
+    def decorator(factory):
+        cached = lru_cache(maxsize=None)(factory)
+
+        @wraps(factory)
+        def get():
+            if components.is_ready(name):
+                return cached()
+            with _load_lock:
+                if components.is_ready(name):
+                    return cached()
+                with components.loading(name):
+                    return cached()
+        get.cache_clear = cached.cache_clear
+        return get
+    return decorator
+
 # Use lru_cache to ensure these are singletons
-@lru_cache(maxsize=None)
+@component("embedding_model")
 def get_embedding_function():
-    return HuggingFaceEmbeddings(model_name=config.embedding_model_name)
+    with components.step("embedding_model", "import"):
+        import_model_libraries()
+    with components.step("embedding_model", "load"):
+        embeddings = load_embeddings(config.embedding_model_name)
+    if not config.embedding_cache.enabled:
+        return embeddings
+    # Shared by ingestion and query-time search; keyed by model so a model switch never reuses vectors
+    # Quantized / ONNX backends produce slightly different vectors, so they get their own cache key
+    backend = config.inference.embedding
+    cache_key = config.embedding_model_name if backend.backend == "torch" else f"{config.embedding_model_name}@{backend.backend}:{backend.onnx_file_name or ''}"
+    cached = CachedEmbeddings(
+        embeddings,
+        model_name=cache_key,
+        path=config.embedding_cache.path,
+        max_entries=config.embedding_cache.max_entries,
+    )
+    registry.add_collector("rag_embedding_cache", cached.stats)
+    return cached
 
-@lru_cache(maxsize=None)
+@component("vector_store")
 def get_vector_store() -> VectorStore:
-    return MilvusVectorStore(embedding_fn=get_embedding_function())
+    embedding_fn = get_embedding_function()
+    if config.vector_db == "milvus":
+        with components.step("vector_store", "import"):
+            import langchain_milvus
+    with components.step("vector_store", "load"):
+        return create_vector_store(embedding_fn)
 
-@lru_cache(maxsize=None)
+@component("lexical_index")
+def get_lexical_index() -> BM25Index:
+    # Shared by ingestion (writes) and queries (reads)
+    hybrid = config.hybrid_search
+    index = BM25Index(path=hybrid.index_path, k1=hybrid.k1, b=hybrid.b)
+    registry.add_collector("rag_bm25_index", index.stats)
+    return index
+
+@component("ingestion_service")
 def get_ingestion_service() -> IngestionService:
-    return IngestionService(vector_store=get_vector_store())
+    return IngestionService(vector_store=get_vector_store(), lexical_index=get_lexical_index())
 
 @lru_cache(maxsize=None)
+def get_ingestion_jobs() -> IngestionJobQueue:
+    # One queue for every ingestion trigger, so runs never overlap
+    jobs = IngestionJobQueue(
+        get_ingestion_service,
+        max_queued=config.ingestion.max_queued_jobs,
+        history=config.ingestion.job_history,
+    )
+    registry.add_collector("rag_ingestion_jobs", jobs.stats)
+    return jobs
+
+@component("rag_service")
 def get_rag_service() -> RAGService:
     # Note: RAGService needs an initialized retriever. This assumes ingestion has happened.
     # In a real app, you might have a health check to confirm this.
-    return RAGService(vector_store=get_vector_store())
\ No newline at end of file
+    vector_store, lexical_index = get_vector_store(), get_lexical_index()
+    with components.step("rag_service", "import"):
+        import langchain_classic.chains
+        import core.llm_langchain
+    with components.step("rag_service", "load"):
+        rag_service = RAGService(vector_store=vector_store, lexical_index=lexical_index)
+    registry.add_collector("rag_query_cache", rag_service.cache_stats)
+    registry.add_collector("rag_reranker", rag_service.reranker_stats)
+    registry.add_collector("rag_llm", rag_service.llm_stats)
+    registry.add_collector("rag_sessions", rag_service.session_stats)
+    return rag_service
+
+def warm_up():
+    """
+    Loads every component and runs a dummy query through retrieval and reranking, so the
+    first user request does not pay for it. Runs in the background after startup.
+    """
+    try:
+        get_rag_service()
+        get_ingestion_service()
+        with components.loading("warmup"), components.step("warmup", "query"):
+            get_rag_service().retrieve(config.startup.warmup_query)
+    except Exception as e:
+        # Reported on /ready; requests will retry loading the failed component
+        print(f"Warm-up failed: {e}")
@@ -0,0 +1,34 @@
+# api/endpoints/index.py
+from fastapi import APIRouter, Depends, HTTPException
+from api.schemas import IngestResponse
+from core.ingestion_jobs import IngestionJobQueue, IngestionQueueFullError
+from core.ingestion_service import INDEX_ACTIONS
+from data_access.vector_store import VectorStore
+from api.dependencies import get_ingestion_jobs, get_vector_store
+
+router = APIRouter()
+
+@router.post("/index/{action}", response_model=IngestResponse)
+async def maintain_index(action: str, ingestion_jobs: IngestionJobQueue = Depends(get_ingestion_jobs)):
+    """
+    Queues an index maintenance job: `rebuild` the vector index with the configured
+    parameters, `compact` the collection (and the BM25 index) or `flush` pending writes.
+    It runs in the ingestion queue, after any running ingestion. Returns a job id;
+    the result is reported by GET /ingest/jobs/{job_id}.
+    """
+    if action not in INDEX_ACTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown index action '{action}', expected one of {list(INDEX_ACTIONS)}.")
+    try:
+        job = ingestion_jobs.submit_index(action)
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return IngestResponse(status="queued", message=f"Index {action} queued.", job_id=job.id)
+
+@router.get("/index/stats")
+def index_stats(vector_store: VectorStore = Depends(get_vector_store)):
+    """
+    Returns the vector index type with its build and search parameters, as configured
+    and as built, the row count and the number of loaded segments (null when unknown).
+    """
+    return vector_store.index_stats()
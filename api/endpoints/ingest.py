@@ -1,24 +1,84 @@
 # api/endpoints/ingest.py
-from fastapi import APIRouter, Depends, BackgroundTasks
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Request
 from api.schemas import IngestResponse
-from core.ingestion_service import IngestionService
-from api.dependencies import get_ingestion_service
+from api.uploads import UploadError, UploadReceiver, UploadTooLargeError
+from core.document_loader import LOADERS
+from core.ingestion_jobs import IngestionJobQueue, IngestionQueueFullError
+from api.dependencies import get_ingestion_jobs
 from core.config import config
 
 router = APIRouter()
 
 @router.post("/ingest", response_model=IngestResponse)
-async def ingest_documents(
-    background_tasks: BackgroundTasks,
-    ingestion_service: IngestionService = Depends(get_ingestion_service)
-):
+async def ingest_documents(ingestion_jobs: IngestionJobQueue = Depends(get_ingestion_jobs)):
     """
-    Triggers the ingestion of documents from the configured directory.
-    Runs as a background task.
+    Queues the ingestion of documents from the configured directory.
+    Returns a job id; progress is reported by GET /ingest/jobs/{job_id}.
     """
-    background_tasks.add_task(ingestion_service.ingest_directory, config.persist_files_directory)
-    
+    try:
+        job = ingestion_jobs.submit_directory(config.persist_files_directory)
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return IngestResponse(
+        status="queued",
+        message=f"Ingestion from '{config.persist_files_directory}' queued.",
+        job_id=job.id,
+    )
+
+@router.post("/ingest/upload", response_model=IngestResponse)
+async def upload_documents(request: Request, ingestion_jobs: IngestionJobQueue = Depends(get_ingestion_jobs)):
+    """
+    Uploads files as multipart/form-data (any field name, .pdf or .txt) and queues the
+    ingestion of just those files. Files are streamed to the configured directory in
+    chunks as they arrive; a file with the same name replaces the existing one.
+    Returns a job id; progress is reported by GET /ingest/jobs/{job_id}.
+    """
+    try:
+        # Reject before receiving the body rather than after
+        ingestion_jobs.check_capacity()
+        receiver = UploadReceiver(
+            request.headers.get("content-type", ""),
+            directory=config.persist_files_directory,
+            prefix=uuid.uuid4().hex,
+            max_file_bytes=config.ingestion.max_upload_bytes,
+            allowed_suffixes=LOADERS,
+        )
+        file_paths = await receiver.receive(request.stream())
+        try:
+            # The files only replace anything in the directory once the job has its queue slot
+            job = ingestion_jobs.submit_files(file_paths, before_queue=receiver.commit)
+        except IngestionQueueFullError:
+            receiver.discard()
+            raise
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return IngestResponse(
-        status="success",
-        message=f"Ingestion started in the background from '{config.persist_files_directory}'."
-    )
\ No newline at end of file
+        status="queued",
+        message=f"Uploaded {len(file_paths)} file(s), ingestion queued.",
+        job_id=job.id,
+    )
+
+@router.get("/ingest/jobs")
+async def list_ingestion_jobs(ingestion_jobs: IngestionJobQueue = Depends(get_ingestion_jobs)):
+    """
+    Returns recent ingestion jobs, newest first.
+    """
+    return ingestion_jobs.list()
+
+@router.get("/ingest/jobs/{job_id}")
+async def ingestion_job_status(job_id: str, ingestion_jobs: IngestionJobQueue = Depends(get_ingestion_jobs)):
+    """
+    Returns a job's status (queued, running, completed or failed), pages and chunks
+    processed so far, chunks written, throughput and per-file errors.
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion job '{job_id}'.")
+    return job
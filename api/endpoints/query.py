@@ -1,11 +1,40 @@
 # api/endpoints/query.py
+import json
+from datetime import datetime, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from api.schemas import QueryRequest, QueryResponse
-from core.rag_service import RAGService
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from api.schemas import BatchQueryRequest, QueryFilters, QueryRequest, QueryResponse
+from core.config import config
+from core.llm_client import LLMOverloadedError, LLMTimeoutError
+from core.rag_service import RAGService, QueryOverloadedError
+from core.sessions import SessionBusyError
+from data_access.filters import FilterError, MetadataFilter
 from api.dependencies import get_rag_service
 
 router = APIRouter()
 
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+def _search_filter(filters: Optional[QueryFilters]) -> Optional[MetadataFilter]:
+    """The request's filters as a MetadataFilter; invalid filters are a 400."""
+    if filters is None or not filters.model_dump(exclude_none=True):
+        return None
+    try:
+        return MetadataFilter(
+            sources=filters.sources,
+            page_min=filters.page_min,
+            page_max=filters.page_max,
+            ingested_after=_timestamp(filters.ingested_after),
+            ingested_before=_timestamp(filters.ingested_before),
+        )
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/query", response_model=QueryResponse)
 async def execute_query(
     request: QueryRequest,
@@ -14,10 +43,128 @@ async def execute_query(
     """
     Answers a query based on the ingested documents.
     """
+    search_filter = _search_filter(request.filters)
     try:
-        response = rag_service.answer_query(request.query)
+        response = await rag_service.aanswer_query(
+            request.query, include_timings=request.include_timings, session_id=request.session_id, search_filter=search_filter
+        )
         print(response)
-        return QueryResponse(answer=response["answer"], sources=response["sources"])
+        return QueryResponse(
+            answer=response["answer"],
+            sources=response["sources"],
+            timings=response.get("timings"),
+            rerank=response.get("rerank"),
+            prompt=response.get("prompt"),
+            session=response.get("session"),
+        )
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (QueryOverloadedError, LLMOverloadedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         # Graceful error handling for the API user [cite: 33]
-        raise HTTPException(status_code=500, detail=f"Failed to process query: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process query: {e}")
+
+@router.get("/query/cache")
+async def query_cache_stats(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Returns query cache hit/miss counters, entry count and approximate size.
+    """
+    return rag_service.cache_stats()
+
+@router.get("/query/reranker")
+async def reranker_stats(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Returns reranker batching (batch fill rate, requests per batch) and score cache counters.
+    """
+    return rag_service.reranker_stats()
+
+@router.get("/query/sessions")
+async def session_stats(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Returns the number and memory of live sessions, evictions, expirations, summaries
+    written and retrievals answered from a session's previous chunks.
+    """
+    return rag_service.session_stats()
+
+@router.delete("/query/sessions/{session_id}")
+async def end_session(session_id: str, rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Forgets a session's history.
+    """
+    if not rag_service.end_session(session_id):
+        raise HTTPException(status_code=404, detail=f"No session '{session_id}'.")
+    return {"status": "deleted", "session_id": session_id}
+
+@router.get("/query/llm")
+async def llm_stats(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Returns LLM client counters: generations started, prompts coalesced onto an in-flight
+    generation, rejections (backpressure), timeouts, cancellations, errors and in-flight count.
+    """
+    return rag_service.llm_stats()
+
+def _sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/query/stream")
+async def stream_query(
+    request: QueryRequest,
+    rag_service: RAGService = Depends(get_rag_service)
+):
+    """
+    Answers a query as a Server-Sent Events stream: a `sources` event first, then
+    `token` events as the LLM generates them, and a `done` event with latency metrics
+    (including time_to_first_token).
+    """
+    search_filter = _search_filter(request.filters)
+    try:
+        # Admission is checked here, before the 200 headers go out
+        stream, release = rag_service.astream_answer(request.query, session_id=request.session_id, search_filter=search_filter)
+    except QueryOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except SessionBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    async def events():
+        try:
+            async for event in stream:
+                yield _sse(event["event"], event["data"])
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield _sse("error", {"detail": f"Failed to process query: {e}"})
+
+    # The stream releases its pending slot when it ends; this covers a client gone before it started
+    return StreamingResponse(events(), media_type="text/event-stream", background=BackgroundTask(release))
+
+@router.post("/query/batch")
+async def batch_query(
+    request: BatchQueryRequest,
+    rag_service: RAGService = Depends(get_rag_service)
+):
+    """
+    Answers many queries in one request. Results are streamed as newline-delimited JSON,
+    one object per query ({"index", "query", "answer", "sources"} or {"index", "query", "error"}),
+    in the order the queries were given.
+    """
+    if len(request.queries) > config.query.batch_max_queries:
+        raise HTTPException(status_code=413, detail=f"At most {config.query.batch_max_queries} queries per batch.")
+    search_filter = _search_filter(request.filters)
+    try:
+        batch, release = rag_service.aanswer_queries(request.queries, include_timings=request.include_timings, search_filter=search_filter)
+    except QueryOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def results():
+        try:
+            async for result in batch:
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Failed to process batch: {e}"}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson", background=BackgroundTask(release))
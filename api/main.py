@@ -1,17 +1,58 @@
 # api/main.py
+import time
+_import_start = time.perf_counter()
+
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from api.endpoints import ingest, query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api.endpoints import index, ingest, query
+from api.dependencies import warm_up
+from core.config import config
+from core.metrics import registry
+from core.readiness import components
+
+# Models, pymilvus and the LLM client are imported lazily, so this covers only what binding the port needs
+print(f"API modules imported in {time.perf_counter() - _import_start:.2f}s.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.startup.warmup:
+        # Models load in the background so the port is bound right away; /ready reports progress
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    else:
+        components.skip("warmup")
+    yield
 
 app = FastAPI(
     title="RAG Q&A System",
     description="An API for document ingestion and retrieval-augmented generation.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Include the routers from the endpoints
 app.include_router(ingest.router, tags=["Ingestion"])
 app.include_router(query.router, tags=["Query"])
+app.include_router(index.router, tags=["Index"])
 
 @app.get("/", tags=["Health Check"])
 async def root():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/ready", tags=["Health Check"])
+async def ready():
+    """
+    Readiness probe: 200 once every component is loaded and warmed up, 503 before that.
+    The body lists each component's state and the time spent importing, loading and warming it up.
+    """
+    is_ready = components.ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "components": components.snapshot()},
+    )
+
+@app.get("/metrics", tags=["Health Check"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of stage latency histograms, counters and cache gauges."""
+    return registry.render()
@@ -1,14 +1,36 @@
 # api/schemas.py
+from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel
 
 class IngestResponse(BaseModel):
     status: str
     message: str
+    job_id: Optional[str] = None # Poll GET /ingest/jobs/{job_id} for progress
+
+class QueryFilters(BaseModel):
+    sources: Optional[List[str]] = None # Only chunks of these files ("source" of the returned sources)
+    page_min: Optional[int] = None # Inclusive page range; chunks without a page number are excluded
+    page_max: Optional[int] = None
+    ingested_after: Optional[datetime] = None # Inclusive ingestion time range; naive times are UTC
+    ingested_before: Optional[datetime] = None
 
 class QueryRequest(BaseModel):
     query: str
+    include_timings: bool = False # Return the per-stage latency breakdown for this request
+    session_id: Optional[str] = None # Answer as a follow-up in this conversation (created on first use)
+    filters: Optional[QueryFilters] = None # Restrict retrieval to matching chunks
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    include_timings: bool = False
+    filters: Optional[QueryFilters] = None # Applied to every query of the batch
 
 class QueryResponse(BaseModel):
     answer: str
     sources: list = []
+    timings: Optional[dict] = None
+    rerank: Optional[dict] = None # Rerank cascade path taken, candidates and how many were scored
+    prompt: Optional[dict] = None # Context packing report, including prompt_tokens
+    session: Optional[dict] = None # Session id and turn number for session queries
     # could add sources here in the future
\ No newline at end of file
@@ -0,0 +1,125 @@
+# api/uploads.py
+import os
+from typing import AsyncIterator, Dict, Iterable, List
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+class UploadError(ValueError):
+    """The upload is malformed, too large or contains an unsupported file type."""
+
+class UploadTooLargeError(UploadError):
+    """A file exceeds ingestion.max_upload_bytes."""
+
+class UploadReceiver:
+    """
+    Streams the file parts of a multipart/form-data body straight to disk as the request
+    body arrives, so only one network chunk is held in memory at a time. Parts are written
+    to `<directory>/.uploads/<prefix>-N.part` and moved to `<directory>/<filename>` by
+    commit() once the whole body has been received; on any error, or discard(), the
+    partial files are removed.
+    """
+    def __init__(self, content_type: str, directory: str, prefix: str, max_file_bytes: int, allowed_suffixes: Iterable[str]):
+        mime, options = parse_options_header(content_type)
+        if mime != b"multipart/form-data" or b"boundary" not in options:
+            raise UploadError("Expected a multipart/form-data body.")
+        self.directory = directory
+        self.staging_directory = os.path.join(directory, ".uploads")
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        self.allowed_suffixes = {suffix.lower() for suffix in allowed_suffixes}
+        self.files: List[dict] = []  # {"filename", "part_path", "bytes"}
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = self._value = b""
+        self._file = None
+        self._parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        if b"filename" not in options:
+            return  # A plain form field, ignored
+        # Never trust client paths: keep the base name only
+        filename = os.path.basename(options[b"filename"].decode("utf-8", "replace").replace("\\", "/"))
+        if not filename or filename.startswith("."):
+            raise UploadError(f"Invalid file name '{filename}'.")
+        if os.path.splitext(filename)[1].lower() not in self.allowed_suffixes:
+            raise UploadError(f"Unsupported file type '{filename}', expected one of {sorted(self.allowed_suffixes)}.")
+        os.makedirs(self.staging_directory, exist_ok=True)
+        part_path = os.path.join(self.staging_directory, f"{self.prefix}-{len(self.files)}.part")
+        self.files.append({"filename": filename, "part_path": part_path, "bytes": 0})
+        self._file = open(part_path, "wb")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._file is None:
+            return
+        current = self.files[-1]
+        current["bytes"] += end - start
+        if current["bytes"] > self.max_file_bytes:
+            raise UploadTooLargeError(f"'{current['filename']}' is larger than {self.max_file_bytes} bytes.")
+        self._file.write(data[start:end])
+
+    def _on_part_end(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def receive(self, body: AsyncIterator[bytes]) -> List[str]:
+        """
+        Consumes the request body into the staged parts and returns the paths the files
+        will be saved to by commit(). Parsing and the .part writes run in the threadpool,
+        one chunk at a time, so slow disks never block the event loop.
+        """
+        try:
+            async for chunk in body:
+                await run_in_threadpool(self._parser.write, chunk)
+            await run_in_threadpool(self._finish)
+        except BaseException:
+            self.discard()
+            raise
+        # Later parts with the same name win, like a later upload of the same file would
+        return list({upload["filename"]: os.path.join(self.directory, upload["filename"]) for upload in self.files}.values())
+
+    def _finish(self):
+        self._parser.finalize()
+        if self._file is not None:
+            raise UploadError("The multipart body ended in the middle of a file.")
+        if not self.files:
+            raise UploadError("No files in the upload.")
+
+    def commit(self):
+        """Moves the staged parts into the directory: renames within one file system, so cheap."""
+        try:
+            for upload in self.files:
+                os.replace(upload["part_path"], os.path.join(self.directory, upload["filename"]))
+        except BaseException:
+            self.discard()
+            raise
+
+    def discard(self):
+        """Removes partially written parts."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for upload in self.files:
+            if os.path.exists(upload["part_path"]):
+                os.remove(upload["part_path"])
@@ -0,0 +1,242 @@
+# benchmarks/run_benchmark.py
+"""
+Offline retrieval and latency benchmark over a fixed corpus (Files/ by default).
+
+For every config variant in variants.json the corpus is ingested into a fresh, temporary
+Milvus-lite db and the annotated queries in queries.json are replayed. Per variant it reports
+Recall@k and MRR, p50/p95/p99 latency per query stage, ingestion chunks/sec and peak memory.
+The LLM is replaced by a deterministic stub unless --llm ollama is given, so runs need no network.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --only baseline --llm ollama
+
+Results are written as JSON to benchmarks/results/<timestamp>.json.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+RECALL_KS = (1, 3, 5, 10, 20, 30, 50)
+STUB_ANSWER = "This is a deterministic stub answer used for benchmarking."
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def apply_overrides(target, overrides: dict, models_mapping: dict):
+    """Apply a (possibly nested) dict of overrides onto the loaded AppConfig."""
+    for key, value in overrides.items():
+        if key == "embedding_model":
+            # Same short-name mapping as load_config
+            target.embedding_model_name = models_mapping.get(value, value)
+        elif isinstance(value, dict):
+            apply_overrides(getattr(target, key), value, models_mapping)
+        else:
+            setattr(target, key, value)
+
+def is_relevant(doc, target: dict) -> bool:
+    """A chunk matches a relevance target by source file, optionally page and any of the key phrases."""
+    if os.path.basename(str(doc.metadata.get("source", ""))) != target["source"]:
+        return False
+    if target.get("pages") and doc.metadata.get("page_number") not in target["pages"]:
+        return False
+    phrases = target.get("contains", [])
+    text = doc.page_content.lower()
+    return not phrases or any(phrase.lower() in text for phrase in phrases)
+
+def recall_ks(candidates: int) -> list:
+    """The RECALL_KS a variant can be scored at: k beyond its reranked candidates would repeat the last value."""
+    return [k for k in RECALL_KS if k <= candidates]
+
+def score_ranking(docs: list, relevant: list, ks: list) -> dict:
+    """Recall@k (share of relevance targets found in the top k) for each k in `ks` and reciprocal rank of the first hit."""
+    first_hit = {}
+    for rank, doc in enumerate(docs, start=1):
+        for i, target in enumerate(relevant):
+            if i not in first_hit and is_relevant(doc, target):
+                first_hit[i] = rank
+    # Every k is reported even when fewer than k docs came back: the missing ranks count as misses
+    scores = {f"recall@{k}": sum(1 for r in first_hit.values() if r <= k) / len(relevant) for k in ks}
+    scores["reciprocal_rank"] = 1 / min(first_hit.values()) if first_hit else 0.0
+    return scores
+
+def peak_rss_mb(who) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def run_variant(variant: dict, queries: list, corpus: str, llm_name: str) -> dict:
+    """Runs one variant in this process. Called in a fresh subprocess per variant."""
+    from core.config import config
+    with open("models_mapping.json") as f:
+        models_mapping = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    config.persisted_db_uri = os.path.join(workdir, "bench.db")
+    config.query_cache.enabled = False # Every replayed query must run the full pipeline
+    apply_overrides(config, variant.get("overrides", {}), models_mapping)
+
+    # Imported after the overrides so everything built below sees them
+    from langchain_core.language_models import FakeStreamingListLLM
+    from core.inference import load_embeddings
+    from core.ingestion_service import IngestionService
+    from core.rag_service import RAGService
+    from data_access.bm25_index import BM25Index
+    from data_access.vector_store import create_vector_store
+
+    vector_store = create_vector_store(load_embeddings(config.embedding_model_name))
+    t0 = time.perf_counter()
+    lexical_index = BM25Index(path=os.path.join(workdir, "bench.bm25.npz"), k1=config.hybrid_search.k1, b=config.hybrid_search.b)
+    report = IngestionService(vector_store, lexical_index=lexical_index).ingest_directory(corpus)
+    ingest_seconds = time.perf_counter() - t0
+
+    llm = FakeStreamingListLLM(responses=[STUB_ANSWER]) if llm_name == "stub" else None
+    rag_service = RAGService(vector_store=vector_store, llm=llm, lexical_index=lexical_index)
+
+    # Retrieval hands this many candidates to the reranker
+    candidates = config.hybrid_search.rerank_candidates if config.hybrid_search.enabled else config.top_k_retrieval
+    ks = recall_ks(candidates)
+    stage_latencies = {}
+    rerank_paths = {}
+    prompt_tokens = []
+    per_query = []
+    for item in queries:
+        result = rag_service.answer_query(item["query"], include_timings=True)
+        for stage, seconds in result["timings"].items():
+            stage_latencies.setdefault(stage, []).append(seconds)
+        path = result.get("rerank", {}).get("path", "none")
+        rerank_paths[path] = rerank_paths.get(path, 0) + 1
+        if result.get("prompt"):
+            prompt_tokens.append(result["prompt"]["prompt_tokens"])
+        ranked_docs = [doc for _, (doc, _) in rag_service.retrieve(item["query"])]
+        per_query.append({"id": item["id"], **score_ranking(ranked_docs, item["relevant"], ks)})
+
+    return {
+        "name": variant["name"],
+        "overrides": variant.get("overrides", {}),
+        "config": {
+            "top_k_retrieval": config.top_k_retrieval,
+            "top_k_ranking": config.top_k_ranking,
+            "embedding_model": config.embedding_model_name,
+            "similarity_metric": config.similarity_metric,
+            "retrieval_algorithm": config.retrieval_algorithm,
+            "hybrid_search": config.hybrid_search.enabled,
+            "rerank_candidates": candidates,
+            "rerank_cascade": config.reranker.cascade.enabled,
+            "embedding_backend": config.inference.embedding.backend,
+            "reranker_backend": config.inference.reranker.backend,
+            "num_threads": config.inference.num_threads,
+            "llm": llm_name,
+        },
+        "quality": {
+            **{f"recall@{k}": sum(q[f"recall@{k}"] for q in per_query) / len(per_query) if per_query else 0.0 for k in ks},
+            "mrr": sum(q["reciprocal_rank"] for q in per_query) / len(per_query) if per_query else 0.0,
+        },
+        "latency_seconds": {
+            stage: {"p50": percentile(v, 50), "p95": percentile(v, 95), "p99": percentile(v, 99), "mean": sum(v) / len(v)}
+            for stage, v in stage_latencies.items()
+        },
+        "rerank_paths": rerank_paths,
+        "prompt_tokens": {"p50": percentile(prompt_tokens, 50), "p95": percentile(prompt_tokens, 95)},
+        "ingestion": {
+            "chunks": report["added"],
+            "seconds": ingest_seconds,
+            "chunks_per_second": report["added"] / ingest_seconds if ingest_seconds > 0 else 0.0,
+            "stage_seconds": report.get("timings", {}),
+        },
+        "peak_rss_mb": {
+            "main": peak_rss_mb(resource.RUSAGE_SELF),
+            "workers": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        },
+        "per_query": per_query,
+    }
+
+def print_summary(results: list):
+    print(f"\n{'variant':<16} {'recall@3':>9} {'recall@10':>10} {'mrr':>6} {'p50 total':>10} {'p95 total':>10} {'chunks/s':>9} {'rss MB':>8}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<16} failed: {r['error']}")
+            continue
+        total = r["latency_seconds"].get("total", {})
+        print(
+            f"{r['name']:<16} {r['quality'].get('recall@3', 0):>9.3f} {r['quality'].get('recall@10', 0):>10.3f} "
+            f"{r['quality']['mrr']:>6.3f} {total.get('p50', 0):>10.3f} {total.get('p95', 0):>10.3f} "
+            f"{r['ingestion']['chunks_per_second']:>9.1f} {r['peak_rss_mb']['main']:>8.0f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default=str(BENCH_DIR / "variants.json"))
+    parser.add_argument("--queries", default=str(BENCH_DIR / "queries.json"))
+    parser.add_argument("--corpus", default="./Files")
+    parser.add_argument("--llm", choices=["stub", "ollama"], default="stub")
+    parser.add_argument("--only", action="append", help="Run only the named variant(s)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--single", help=argparse.SUPPRESS) # Internal: run one variant (JSON) in this process
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        queries = json.load(f)
+
+    if args.single:
+        result = run_variant(json.loads(args.single), queries, args.corpus, args.llm)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        return
+
+    with open(args.variants) as f:
+        variants = [v for v in json.load(f) if not args.only or v["name"] in args.only]
+
+    results = []
+    for variant in variants:
+        print(f"=== Running variant '{variant['name']}'")
+        # A fresh process per variant isolates the global config and gives a clean peak RSS
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            result_path = tmp.name
+        cmd = [
+            sys.executable, "-m", "benchmarks.run_benchmark", "--single", json.dumps(variant),
+            "--queries", args.queries, "--corpus", args.corpus, "--llm", args.llm, "--output", result_path,
+        ]
+        completed = subprocess.run(cmd)
+        if completed.returncode == 0:
+            with open(result_path) as f:
+                results.append(json.load(f))
+        else:
+            results.append({"name": variant["name"], "error": f"exit code {completed.returncode}"})
+        os.unlink(result_path)
+
+    output = Path(args.output) if args.output else BENCH_DIR / "results" / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    git_commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    with open(output, "w") as f:
+        json.dump({
+            "created": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": args.corpus,
+            "queries": len(queries),
+            "variants": results,
+        }, f, indent=2)
+
+    print_summary(results)
+    print(f"\nResults written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
+import json
+import uuid
 import requests
 
 BASE_URL = "http://127.0.0.1:8000"
 INGEST_URL = f"{BASE_URL}/ingest"
 QUERY_URL = f"{BASE_URL}/query"
+STREAM_URL = f"{BASE_URL}/query/stream"
 
 show_sources = True
+# Follow-up questions in this run are answered in the context of the earlier ones
+SESSION_ID = uuid.uuid4().hex
 
 while True:
     print("\033[34m\nMENU:")
@@ -16,25 +21,42 @@ while True:
         case 1:
             r = requests.post(INGEST_URL)
             if r.status_code == 200:
-                print("Ingestion triggered successfully.")
+                print(f"Ingestion queued (job {r.json()['job_id']}).")
         case 2: 
             query_text = input("QUERY: ").strip()
-            payload = {"query": query_text}
-            r = requests.post(QUERY_URL, json=payload)
-            if r.status_code == 200:
-                data = r.json()
-                answer = data.get("answer", "No answer found.")
-                sources = data.get("sources", [])
-
-                if show_sources:
-                    print("\nSOURCES:")
-                    for i, source in enumerate(sources):
-                        print(f"{i+1}) ")
-                        print(f"\033[32m{source}\033[0m")
-                        print("-----")
-                print(f"\nANSWER: {answer}\n")
-            else:
-                print(f"Error: Received status code {r.status_code}")
+            payload = {"query": query_text, "session_id": SESSION_ID}
+            # Stream the answer (Server-Sent Events) and print tokens as they arrive
+            with requests.post(STREAM_URL, json=payload, stream=True) as r:
+                if r.status_code != 200:
+                    print(f"Error: Received status code {r.status_code}")
+                    continue
+                event = None
+                for line in r.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                        continue
+                    if not line.startswith("data: "):
+                        continue
+                    data = json.loads(line[len("data: "):])
+                    match event:
+                        case "sources":
+                            if show_sources:
+                                print("\nSOURCES:")
+                                for i, source in enumerate(data.get("sources", [])):
+                                    print(f"{i+1}) ")
+                                    print(f"\033[32m{source}\033[0m")
+                                    print("-----")
+                            print("\nANSWER: ", end="", flush=True)
+                        case "token":
+                            print(data["text"], end="", flush=True)
+                        case "done":
+                            ttft = data["metrics"]["time_to_first_token"]
+                            if ttft is not None:
+                                print(f"\n\n(time to first token: {ttft:.2f}s, total: {data['metrics']['total']:.2f}s)")
+                            else:
+                                print()
+                        case "error":
+                            print(f"\nError: {data['detail']}")
         case 3:
             print("Exiting...")
             break
@@ -1,25 +1,159 @@
 # core/config.py
 import json
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from pathlib import Path
 
+class StubLLMConfig(BaseModel):
+    ttft_ms: float = 200 # Delay before the first token
+    tokens_per_second: float = 50 # 0 streams the whole answer at once
+    response: str = "This is a stub answer generated offline for load testing."
+
 class GenerationLLMConfig(BaseModel):
-    provider: str = "ollama"
+    provider: str = "ollama" # "ollama" or "stub" (offline load testing)
     model: str = "gemma3:1b"
     temperature: float = 0.7
     max_tokens: int = Field(1024, alias='max_tokens')
+    base_url: str = "http://localhost:11434"
+    keep_alive: str = "30m" # How long Ollama keeps the model loaded between requests
+    max_concurrency: int = 4 # Generations (and pooled keep-alive connections) at once
+    max_pending: int = 64 # Queued + running generations before new ones are rejected
+    timeout_seconds: float = 120 # Max wait for the first token (queueing included) and between streamed tokens
+    connect_timeout_seconds: float = 5
+    retries: int = 2 # Connection errors / 5xx before the first token
+    stub: StubLLMConfig = StubLLMConfig()
+
+class IngestionConfig(BaseModel):
+    batch_size: int = 256 # Chunks embedded and inserted per vector store write
+    workers: int = 4 # Processes parsing and splitting files
+    queue_depth: int = 4 # Batches buffered between pipeline stages
+    max_queued_jobs: int = 8 # Ingestion jobs waiting to run (one runs at a time)
+    job_history: int = 100 # Finished jobs kept for GET /ingest/jobs
+    max_upload_bytes: int = 100 * 1024 * 1024 # Per uploaded file
+
+class QueryConfig(BaseModel):
+    max_concurrency: int = 4 # Queries executing at once in the query worker pool
+    max_pending: int = 64 # Queries running or waiting before new ones are rejected
+    batch_max_queries: int = 1000 # Largest batch accepted by /query/batch
+    batch_chunk_size: int = 32 # Queries embedded, searched and reranked together; bounds batch memory
+    batch_llm_concurrency: int = 4 # LLM calls in flight at once for a batch
+
+class AnnIndexConfig(BaseModel):
+    # Build parameters of the retrieval_algorithm index; changes apply to new collections or after an index rebuild
+    hnsw_m: int = 16 # HNSW graph degree: higher recall, more memory
+    hnsw_ef_construction: int = 200 # HNSW build candidate list: better graph, slower build
+    ivf_nlist: int = 1024 # IVF_* clusters; about 4 * sqrt(rows) is a common start
+    # Search parameters, used on every query
+    search_ef: int = 64 # HNSW search candidate list (at least k): higher recall, more latency
+    ivf_nprobe: int = 16 # IVF_* clusters searched per query: higher recall, more latency
+
+class NumpyVectorStoreConfig(BaseModel):
+    path: Optional[str] = None # Directory of the vector file and metadata sidecar; defaults to <persisted_db stem>.vectors
+    dtype: str = "float32" # float32 | float16 (half the memory and disk, slightly coarser scores); fixed once the store is written
+    search_block_rows: int = 65536 # Rows scored per matrix product; bounds search memory
+
+class VectorStoreConfig(BaseModel):
+    index: AnnIndexConfig = AnnIndexConfig()
+    numpy: NumpyVectorStoreConfig = NumpyVectorStoreConfig() # vector_db "numpy"
+    # Metadata fields given a scalar index, so filtered queries only scan matching rows
+    scalar_index_fields: List[str] = ["source", "page_number", "ingested_at"]
+    scalar_index_type: str = "INVERTED"
+    # Milvus server only (not Milvus Lite): hash rows into partitions by this metadata field
+    # (e.g. a tenant id), so filters on it search only the matching partitions. Set before
+    # the collection is created.
+    partition_key_field: Optional[str] = None
+
+class QueryCacheConfig(BaseModel):
+    enabled: bool = True
+    max_entries: int = 1000
+    max_bytes: int = 64 * 1024 * 1024
+    ttl_seconds: float = 3600 # 0 disables expiry
+    similarity_threshold: float = 0.95 # Cosine similarity for a semantic hit; > 1 disables the semantic tier
+
+class SessionConfig(BaseModel):
+    max_sessions: int = 1000
+    max_bytes: int = 32 * 1024 * 1024
+    ttl_seconds: float = 1800 # Idle time before a session expires; 0 disables expiry
+    history_turns: int = 2 # Most recent turns kept verbatim, older ones are folded into the summary
+    history_max_tokens: int = 300 # Budget for the verbatim turns in the prompt
+    summary_max_tokens: int = 200 # Budget for the running summary in the prompt
+    contextualize: bool = True # Prefix the previous question to a follow-up for retrieval
+    reuse_threshold: float = 0.85 # Cosine similarity to the previous retrieval query to reuse its chunks; > 1 disables
+
+class RerankCascadeConfig(BaseModel):
+    enabled: bool = False # Off by default: it trades CrossEncoder calls for recall, measure with the benchmark first
+    prune_keep: int = 12 # Candidates (in retrieval order) the CrossEncoder scores; 0 keeps all
+    early_exit_margin: float = 0.5 # Skip the CrossEncoder when the vector score gap after the top_k_ranking-th hit is this share of the score spread
+    latency_budget_ms: float = 0 # Stop CrossEncoder scoring once this is spent; 0 disables the budget
+    budget_step: int = 4 # Candidates scored per CrossEncoder call while a budget is set
+
+class RerankerConfig(BaseModel):
+    batch_size: int = 64 # Max (query, chunk) pairs per CrossEncoder forward pass
+    max_wait_ms: float = 5 # How long the batcher waits for other queries to fill a batch
+    cache_size: int = 50000 # (query, chunk) scores kept
+    cascade: RerankCascadeConfig = RerankCascadeConfig()
+
+class EmbeddingCacheConfig(BaseModel):
+    enabled: bool = True
+    path: Optional[str] = None # Defaults to <persisted_db stem>.embeddings.sqlite
+    max_entries: int = 1_000_000
+
+class HybridSearchConfig(BaseModel):
+    enabled: bool = True # Fuse BM25 hits with the vector search before reranking
+    index_path: Optional[str] = None # Defaults to <persisted_db stem>.bm25.npz
+    lexical_k: int = 20 # BM25 candidates per query
+    rerank_candidates: int = 30 # Fused candidates passed to the reranker; keep >= top_k_retrieval so hybrid never reranks fewer than vector-only
+    vector_weight: float = 1.0 # Reciprocal rank fusion weights
+    lexical_weight: float = 1.0
+    rrf_k: int = 60 # RRF rank offset; larger values flatten the rank contribution
+    k1: float = 1.5 # BM25 term frequency saturation
+    b: float = 0.75 # BM25 length normalization
+
+class ModelBackendConfig(BaseModel):
+    backend: str = "torch" # torch (fp32) | int8 (dynamic quantization) | onnx (ONNX Runtime)
+    onnx_file_name: Optional[str] = None # ONNX file in the model repo, e.g. "onnx/model_qint8_avx2.onnx"; exported when unset
+
+class InferenceConfig(BaseModel):
+    device: str = "auto" # auto | cpu | cuda | mps; int8 and onnx always run on cpu
+    num_threads: int = 0 # Intra-op threads for PyTorch and ONNX Runtime; 0 keeps the library default
+    warmup: bool = True # Run a dummy forward pass right after loading each model
+    embedding: ModelBackendConfig = ModelBackendConfig()
+    reranker: ModelBackendConfig = ModelBackendConfig()
+
+class ContextConfig(BaseModel):
+    max_tokens: int = 1500 # Token budget for the retrieved context in the prompt
+    tokenizer: Optional[str] = None # HuggingFace tokenizer matching generation_llm.model; ~4 chars/token when unset
+
+class StartupConfig(BaseModel):
+    warmup: bool = True # Load all models in the background after startup and run warmup_query
+    warmup_query: str = "Where was Einstein born?"
+
+class MetricsConfig(BaseModel):
+    enabled: bool = True # Stage latency histograms exposed on /metrics
 
 class AppConfig(BaseModel):
     persist_files_directory: str = "./Files"
-    vector_db: str = "milvus"
+    vector_db: str = "milvus" # milvus | numpy (in-process exact search over a memory-mapped file)
     persisted_db_uri: str = Field(..., alias='persisted_db') # Renamed for clarity
     top_k_retrieval: int = 10
     top_k_ranking: int = 5
     embedding_model_name: str = Field(..., alias='embedding_model') # Full name after mapping
     reranker_model: str = "BAAI/bge-reranker-base"
     similarity_metric: str = "L2"
-    retrieval_algorithm: str = "AUTOINDEX"
+    retrieval_algorithm: str = "AUTOINDEX" # Vector index type: AUTOINDEX, FLAT, IVF_FLAT, IVF_SQ8, HNSW (Milvus Lite: AUTOINDEX, FLAT, IVF_FLAT)
+    vector_store: VectorStoreConfig = VectorStoreConfig()
     generation_llm: GenerationLLMConfig
+    ingestion: IngestionConfig = IngestionConfig()
+    query: QueryConfig = QueryConfig()
+    query_cache: QueryCacheConfig = QueryCacheConfig()
+    sessions: SessionConfig = SessionConfig()
+    reranker: RerankerConfig = RerankerConfig()
+    embedding_cache: EmbeddingCacheConfig = EmbeddingCacheConfig()
+    hybrid_search: HybridSearchConfig = HybridSearchConfig()
+    inference: InferenceConfig = InferenceConfig()
+    context: ContextConfig = ContextConfig()
+    startup: StartupConfig = StartupConfig()
+    metrics: MetricsConfig = MetricsConfig()
 
 def load_config(config_path="config.json", models_mapping_path="models_mapping.json") -> AppConfig:
     """Loads configuration from JSON files and maps model names."""
@@ -0,0 +1,132 @@
+# core/context.py
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from core.config import config
+
+# Shortest shared prefix/suffix taken as a split overlap rather than a coincidence
+MIN_OVERLAP_CHARS = 20
+# Don't bother truncating a segment into less room than this
+MIN_SEGMENT_TOKENS = 32
+SEGMENT_SEPARATOR = "\n\n"
+
+class TokenCounter:
+    """
+    Counts tokens with the HuggingFace tokenizer named in context.tokenizer (loaded on first
+    use). Without one, or if it cannot be loaded, falls back to ~4 characters per token.
+    """
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.name = "approx"
+        self._tokenizer = None
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+                self.name = tokenizer_name
+            except Exception as e:
+                print(f"Could not load tokenizer {tokenizer_name} ({e}), approximating token counts.")
+
+    def count(self, text: str) -> int:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False))
+        return (len(text) + 3) // 4
+
+@lru_cache(maxsize=None)
+def get_token_counter() -> TokenCounter:
+    return TokenCounter(config.context.tokenizer)
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if too short to trust)."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _merge_group(segments: List[dict]) -> List[dict]:
+    """
+    Merges the chunks of one source page: duplicates and chunks contained in another are
+    dropped, and chunks that overlap (the splitter's chunk_overlap) are joined into one segment.
+    """
+    merged: List[dict] = []
+    for segment in segments:
+        for other in merged:
+            text, other_text = segment["text"], other["text"]
+            if text in other_text:
+                pass
+            elif other_text in text:
+                other["text"] = text
+            elif size := _overlap(other_text, text):
+                other["text"] = other_text + text[size:]
+            elif size := _overlap(text, other_text):
+                other["text"] = text + other_text[size:]
+            else:
+                continue
+            other["score"] = max(other["score"], segment["score"])
+            other["chunks"] += segment["chunks"]
+            break
+        else:
+            merged.append(dict(segment))
+    if len(merged) < len(segments):
+        # A merged segment can now overlap another one of the same page
+        return _merge_group(merged) if len(merged) > 1 else merged
+    return merged
+
+def _truncate(text: str, budget: int, count: Callable[[str], int]) -> str:
+    """Longest prefix of text, cut at a word boundary, that fits in budget tokens."""
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+    return cut[:cut.rfind(" ")] if " " in cut and low < len(text) else cut
+
+def truncate_tokens(text: str, budget: int, counter: Optional[TokenCounter] = None) -> str:
+    """`text` cut at a word boundary to fit in budget tokens (unchanged if it already fits)."""
+    counter = counter or get_token_counter()
+    return text if counter.count(text) <= budget else _truncate(text, budget, counter.count)
+
+def pack_context(final_docs_with_scores: list, budget: int, counter: Optional[TokenCounter] = None) -> Tuple[str, dict]:
+    """
+    Assembles the LLM context from reranked (rerank_score, (doc, vector_score)) pairs.
+    Chunks of the same source and page that repeat or overlap are merged, then segments are
+    added best relevance first while they fit in `budget` tokens; the first segment that
+    does not fit is truncated if enough room is left. Returns the context and a report.
+    """
+    counter = counter or get_token_counter()
+    groups = {}
+    for rank, (rerank_score, (doc, _)) in enumerate(final_docs_with_scores):
+        key = (doc.metadata.get("source"), doc.metadata.get("page_number"))
+        # Unscored chunks (rerank cascade) rank after scored ones, in retrieval order
+        score = float(rerank_score) if rerank_score is not None else float("-inf")
+        groups.setdefault(key, []).append({"text": doc.page_content.strip(), "score": score, "rank": rank, "chunks": 1})
+
+    segments = [segment for group in groups.values() for segment in _merge_group(group)]
+    segments.sort(key=lambda s: (-s["score"], s["rank"]))
+
+    packed, used, truncated = [], 0, 0
+    separator_tokens = counter.count(SEGMENT_SEPARATOR)
+    for segment in segments:
+        cost = counter.count(segment["text"]) + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(segment["text"])
+            used += cost
+            continue
+        room = budget - used - (separator_tokens if packed else 0)
+        if room >= MIN_SEGMENT_TOKENS:
+            packed.append(_truncate(segment["text"], room, counter.count))
+            truncated += 1
+            break
+        # Too little room left for this one; a shorter, less relevant segment may still fit
+
+    context = SEGMENT_SEPARATOR.join(packed)
+    return context, {
+        "chunks": len(final_docs_with_scores),
+        "segments": len(segments),
+        "packed_segments": len(packed),
+        "truncated_segments": truncated,
+        "context_tokens": counter.count(context),
+        "budget": budget,
+        "tokenizer": counter.name,
+    }
@@ -1,6 +1,5 @@
 # core/document_loader.py
 # (Your reader.py code goes here, unchanged. It's already good.)
-import fitz  # PyMuPDF
 from pathlib import Path
 import inspect
 from langchain_core.documents import Document
@@ -15,7 +14,10 @@ def Error(msg="Error detected"):
     raise ValueError(f"[{full_name}] {msg}")
 
 class PDFReader:
-    """Handles text extraction from regular (non-scanned) PDFs using PyMuPDF."""
+    """
+    Handles text extraction from regular (non-scanned) PDFs using PyMuPDF.
+    Use it as a context manager (or call close()) so the file handle is released deterministically.
+    """
 
     def __init__(self, filename: str):
         self.filepath = Path(filename)
@@ -24,8 +26,21 @@ class PDFReader:
         if self.filepath.suffix.lower() != ".pdf":
             raise ValueError(f"Unsupported file type: {self.filepath.suffix}")
         
+        import fitz  # PyMuPDF; imported on first use to keep server startup light
         self.doc = fitz.open(self.filepath)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the underlying fitz document."""
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
     def get_page_count(self) -> int:
         """Return the total number of pages in the PDF."""
         return len(self.doc)
@@ -39,21 +54,26 @@ class PDFReader:
         text = page.get_text("text")
         return text.strip()
 
+    def iter_pages(self):
+        """Yield (page_no, text) one page at a time (1-indexed)."""
+        for page_no in range(1, self.get_page_count() + 1):
+            yield page_no, self.extract_text(page_no)
+
 class PDFLoader:
     """Wrapper around PDFReader to load LangChain Document objects."""
     def __init__(self, filename: str):
         self.filename = filename
-        self.reader = PDFReader(filename)
     
+    def lazy_load(self):
+        """Yield one LangChain Document per page; the PDF is closed once iteration ends."""
+        with PDFReader(self.filename) as reader:
+            for page_no, text in reader.iter_pages():
+                metadata = {"source": self.filename, "page_number": page_no}
+                yield Document(page_content=text, metadata=metadata)
+
     def load(self):
         """Return list of LangChain Document objects (one per page)."""
-        docs = []
-        num_pages = self.reader.get_page_count()
-        for i in range(1, num_pages + 1):
-            text = self.reader.extract_text(i)
-            metadata = {"source": self.filename, "page_number": i}
-            docs.append(Document(page_content=text, metadata=metadata))
-        return docs
+        return list(self.lazy_load())
 
 class TextLoader:
     """Generic text file loader."""
@@ -61,26 +81,42 @@ class TextLoader:
         self.filename = filename
         self.encoding = encoding
     
-    def load(self):
-        """Return list with a single LangChain Document object."""
+    def lazy_load(self):
+        """Yield a single LangChain Document object."""
         with open(self.filename, "r", encoding=self.encoding) as f:
             text = f.read()
         metadata = {"source": self.filename}
-        return [Document(page_content=text, metadata=metadata)]
+        yield Document(page_content=text, metadata=metadata)
+
+    def load(self):
+        """Return list with a single LangChain Document object."""
+        return list(self.lazy_load())
+
+# File suffix -> loader; also the file types accepted for upload
+LOADERS = {
+    ".pdf": PDFLoader,
+    ".txt": TextLoader,
+}
 
 class DocumentLoader:
     def __init__(self, filename: str):
         self.filename = filename
         self.filetype = Path(filename).suffix.lower()
-        self.loaders = {
-            ".pdf": PDFLoader,
-            ".txt": TextLoader,
-        }
-    def load(self):
+        self.loaders = LOADERS
+    def _get_loader(self):
         if self.filetype in self.loaders:
             loader_class = self.loaders[self.filetype]
-            loader = loader_class(self.filename)
-            return loader.load()
+            return loader_class(self.filename)
         else:
             Error(f"No loader available for file type: {self.filetype}")
             # raise ValueError(f"No loader available for file type: {self.filetype}")
+
+    def load(self):
+        return self._get_loader().load()
+
+    def lazy_load(self):
+        """
+        Yield pages one at a time instead of materialising the whole document.
+        Each page can be split and released before the next one is parsed.
+        """
+        yield from self._get_loader().lazy_load()
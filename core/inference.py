@@ -0,0 +1,107 @@
+# core/inference.py
+# Loads the embedding model and the CrossEncoder with the backend selected in config.inference:
+# "torch" (fp32), "int8" (PyTorch dynamic quantization of the Linear layers) or "onnx"
+# (ONNX Runtime, needs `pip install "sentence-transformers[onnx]"`). int8 and onnx run on cpu.
+import time
+from typing import TYPE_CHECKING, Optional
+from core.config import ModelBackendConfig, config
+
+# torch, sentence-transformers and langchain_huggingface take seconds to import, so they are
+# imported by the loaders rather than at server startup
+if TYPE_CHECKING:
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from sentence_transformers import CrossEncoder
+
+BACKENDS = ("torch", "int8", "onnx")
+WARMUP_TEXT = "warm-up query"
+
+def import_model_libraries():
+    """Imports what the loaders need up front, so the import time can be measured on its own."""
+    import torch
+    import sentence_transformers
+    import langchain_huggingface
+
+def resolve_device() -> str:
+    import torch
+    device = config.inference.device
+    if device != "auto":
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+def configure_threads():
+    """Applies inference.num_threads to PyTorch (ONNX sessions get it through their session options)."""
+    import torch
+    if config.inference.num_threads > 0:
+        torch.set_num_threads(config.inference.num_threads)
+
+def _model_kwargs(backend_config: ModelBackendConfig) -> dict:
+    """Constructor arguments shared by SentenceTransformer and CrossEncoder for the chosen backend."""
+    if backend_config.backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend_config.backend}', expected one of {BACKENDS}.")
+    if backend_config.backend != "onnx":
+        return {}
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError('The "onnx" backend needs ONNX Runtime: pip install "sentence-transformers[onnx]"') from e
+    session_options = onnxruntime.SessionOptions()
+    if config.inference.num_threads > 0:
+        session_options.intra_op_num_threads = config.inference.num_threads
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+    if backend_config.onnx_file_name:
+        # e.g. one of the pre-quantized exports shipped in the model repo
+        model_kwargs["file_name"] = backend_config.onnx_file_name
+    return {"backend": "onnx", "model_kwargs": model_kwargs}
+
+def _device(backend_config: ModelBackendConfig) -> str:
+    # Dynamic int8 kernels and the ONNX CPU provider only run on cpu
+    return resolve_device() if backend_config.backend == "torch" else "cpu"
+
+def _quantize(module: "torch.nn.Module", backend_config: ModelBackendConfig):
+    if backend_config.backend == "int8":
+        import torch
+        torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def _warm_up(name: str, backend_config: ModelBackendConfig, run):
+    """One dummy forward pass so the first real request does not pay for lazy initialization."""
+    if not config.inference.warmup:
+        return
+    t0 = time.perf_counter()
+    run()
+    print(f"Warmed up {name} ({backend_config.backend}) in {time.perf_counter() - t0:.2f}s.")
+
+def load_embeddings(model_name: Optional[str] = None) -> "HuggingFaceEmbeddings":
+    from langchain_huggingface import HuggingFaceEmbeddings
+    backend_config = config.inference.embedding
+    model_name = model_name or config.embedding_model_name
+    device = _device(backend_config)
+    configure_threads()
+    kwargs = _model_kwargs(backend_config)
+    t0 = time.perf_counter()
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device, **kwargs},
+    )
+    _quantize(embeddings._client, backend_config)
+    print(f"Loaded embedding model {model_name} ({backend_config.backend}, {device}) in {time.perf_counter() - t0:.2f}s.")
+    _warm_up("embedding model", backend_config, lambda: embeddings.embed_documents([WARMUP_TEXT]))
+    return embeddings
+
+def load_cross_encoder(model_name: Optional[str] = None, max_length: int = 512) -> "CrossEncoder":
+    from sentence_transformers import CrossEncoder
+    backend_config = config.inference.reranker
+    model_name = model_name or config.reranker_model
+    device = _device(backend_config)
+    configure_threads()
+    kwargs = _model_kwargs(backend_config)
+    t0 = time.perf_counter()
+    model = CrossEncoder(model_name, max_length=max_length, device=device, **kwargs)
+    _quantize(model.model, backend_config)
+    print(f"Loaded reranker {model_name} ({backend_config.backend}, {device}) in {time.perf_counter() - t0:.2f}s.")
+    _warm_up("reranker", backend_config, lambda: model.predict([(WARMUP_TEXT, WARMUP_TEXT)], show_progress_bar=False))
+    return model
@@ -0,0 +1,153 @@
+# core/ingestion_jobs.py
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from core.ingestion_service import IngestionService
+
+class IngestionQueueFullError(RuntimeError):
+    """Raised when ingestion.max_queued_jobs jobs are already waiting."""
+
+class IngestionJob:
+    """State and progress counters of one ingestion run, updated by the pipeline as it goes."""
+    def __init__(self, kind: str, target, files: List[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind  # "directory", "upload" or "index"
+        self.target = target  # directory path, list of file paths or index action
+        self.files = files
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.counters = {"pages": 0, "chunks": 0, "chunks_written": 0}
+        self.errors: dict = {}
+        self.report: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def progress(self, counter: str, increment: int):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + increment
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        snapshot = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "files": self.files,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 3),
+            **counters,
+            "pages_per_second": round(counters["pages"] / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(counters["chunks_written"] / elapsed, 2) if elapsed else 0.0,
+            "errors": self.errors,
+        }
+        if self.kind == "index":
+            snapshot["action"] = self.target
+            if self.report is not None:
+                snapshot["report"] = self.report
+        elif self.report is not None:
+            snapshot["report"] = {key: self.report[key] for key in ("ingested", "skipped", "removed", "failed", "added", "deleted") if key in self.report}
+        return snapshot
+
+class IngestionJobQueue:
+    """
+    Runs ingestion jobs one at a time on a single background thread, so overlapping
+    requests never write to (or reset) the collection concurrently. At most
+    `max_queued` jobs wait; finished jobs are kept for status queries up to `history`.
+    The ingestion service is resolved when the first job runs, so submitting never
+    waits for the models to load.
+    """
+    def __init__(self, get_service: Callable[[], IngestionService], max_queued: int, history: int):
+        self._get_service = get_service
+        self._max_queued = max_queued
+        self._history = history
+        self._queue: "queue.Queue[IngestionJob]" = queue.Queue()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="ingestion-jobs", daemon=True)
+        self._worker.start()
+
+    def check_capacity(self):
+        """Raise IngestionQueueFullError if no more jobs can be queued."""
+        if self._queue.qsize() >= self._max_queued:
+            raise IngestionQueueFullError(f"Too many queued ingestion jobs ({self._queue.qsize()}), try again later.")
+
+    def submit_directory(self, dir_path: str) -> IngestionJob:
+        return self._submit(IngestionJob("directory", dir_path, files=[]))
+
+    def submit_files(self, file_paths: List[str], before_queue: Optional[Callable[[], None]] = None) -> IngestionJob:
+        """
+        `before_queue` runs once the job is sure to be queued, e.g. to move uploaded files
+        into place: when the queue is full it does not run, and nothing has changed on disk.
+        """
+        job = IngestionJob("upload", file_paths, files=[os.path.basename(path) for path in file_paths])
+        return self._submit(job, before_queue)
+
+    def submit_index(self, action: str) -> IngestionJob:
+        """Queues index maintenance, so it never runs while documents are being written."""
+        return self._submit(IngestionJob("index", action, files=[]))
+
+    def _submit(self, job: IngestionJob, before_queue: Optional[Callable[[], None]] = None) -> IngestionJob:
+        with self._lock:
+            self.check_capacity()
+            if before_queue is not None:
+                before_queue()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                # Drop the oldest finished job; queued and running ones are always kept
+                oldest = next((id_ for id_, j in self._jobs.items() if j.status in ("completed", "failed")), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest]
+            self._queue.put(job)
+        print(f"Queued ingestion job {job.id} ({job.kind}).")
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in reversed(jobs)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "completed", "failed")}
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.status, job.started_at = "running", time.time()
+            try:
+                service = self._get_service()
+                if job.kind == "index":
+                    job.report = service.maintain_index(job.target)
+                    job.status = "completed"
+                else:
+                    if job.kind == "directory":
+                        job.report = service.ingest_directory(job.target, progress=job.progress)
+                    else:
+                        job.report = service.ingest_files(job.target, progress=job.progress)
+                    job.errors = job.report["errors"]
+                    # A job "completes" even if some files failed; their errors are listed per file
+                    job.status = "completed" if not job.report["failed"] or job.report["ingested"] or job.report["skipped"] else "failed"
+            except Exception as e:
+                print(f"Ingestion job {job.id} failed: {e}")
+                job.errors = {"job": str(e)}
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                print(f"Ingestion job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s.")
@@ -0,0 +1,240 @@
+# core/ingestion_pipeline.py
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from langchain_core.documents import Document
+from core.config import config
+from core.document_loader import DocumentLoader
+from core.metrics import INGESTED_CHUNKS_TOTAL, observe_ingest
+from data_access.vector_store import VectorStore
+
+# prepare(file_path, chunk_batch) -> (documents to write, their ids)
+PrepareFn = Callable[[str, List[Document]], Tuple[List[Document], List[str]]]
+# finish(file_path) is called once every chunk of a file has been passed to prepare
+FinishFn = Callable[[str], None]
+# progress(counter, increment) for "pages" parsed, "chunks" split and "chunks_written"
+ProgressFn = Callable[[str, int], None]
+
+_STOP = None
+_CHUNKS = "chunks"
+_DONE = "done"
+_FAILED = "failed"
+
+def iter_file_batches(file_path: str, chunk_size: int, chunk_overlap: int, batch_size: int):
+    """
+    Stream a file as batches of split chunks. Pages are parsed lazily and split one
+    at a time, so at most one page and one batch of chunks are alive at once.
+    Yields (chunks, pages, load_seconds, split_seconds) for each batch.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    pages = DocumentLoader(file_path).lazy_load()
+    batch, pages_read, load_s, split_s = [], 0, 0.0, 0.0
+    while True:
+        t0 = time.perf_counter()
+        page = next(pages, None)
+        t1 = time.perf_counter()
+        load_s += t1 - t0
+        if page is None:
+            break
+        pages_read += 1
+        batch.extend(splitter.split_documents([page]))
+        split_s += time.perf_counter() - t1
+        if len(batch) >= batch_size:
+            yield batch, pages_read, load_s, split_s
+            batch, pages_read, load_s, split_s = [], 0, 0.0, 0.0
+    if batch or pages_read or load_s or split_s:
+        yield batch, pages_read, load_s, split_s
+
+def stream_file(file_path: str, chunk_size: int, chunk_overlap: int, batch_size: int, out_queue):
+    """Worker process entry point: push a file's chunk batches onto the shared bounded queue."""
+    try:
+        for batch, pages_read, load_s, split_s in iter_file_batches(file_path, chunk_size, chunk_overlap, batch_size):
+            out_queue.put((file_path, _CHUNKS, (batch, pages_read, load_s, split_s))) # Blocks while the consumer is behind
+        out_queue.put((file_path, _DONE, None))
+    except Exception as e:
+        out_queue.put((file_path, _FAILED, str(e)))
+
+class IngestionPipeline:
+    """
+    Staged ingestion: a process pool streams parsed and split chunks from files, a single
+    thread embeds fixed-size batches of chunks and a single thread writes them to the
+    vector store. Stages are connected by bounded queues so a slow stage applies
+    backpressure all the way back to PDF parsing, and peak memory depends on
+    batch_size * queue_depth rather than on document size.
+    """
+    def __init__(self, vector_store: VectorStore, chunk_size: int, chunk_overlap: int):
+        self._vector_store = vector_store
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._workers = max(1, config.ingestion.workers)
+        self._queue_depth = max(1, config.ingestion.queue_depth)
+        self._batch_size = max(1, config.ingestion.batch_size)
+
+    def run(self, file_paths: List[str], prepare: PrepareFn, finish: FinishFn, progress: Optional[ProgressFn] = None) -> dict:
+        """
+        Ingests `file_paths`. Returns the files whose chunks were all written, the files
+        that failed (with the error) and per-stage timings in seconds. `progress` is told
+        about pages and chunks as they go through the stages.
+        """
+        progress = progress or (lambda counter, increment: None)
+        start = time.perf_counter()
+        timings = {"load": 0.0, "split": 0.0, "embed": 0.0, "insert": 0.0}
+        completed: List[str] = []
+        failed = {}
+        pending = {}  # file_path -> chunks queued but not yet written
+        parsed = set()  # files whose last chunk has been queued
+        lock = threading.Lock()
+
+        embed_queue = queue.Queue(maxsize=self._queue_depth)
+        write_queue = queue.Queue(maxsize=self._queue_depth)
+
+        def maybe_complete(file_path):
+            # Caller holds the lock
+            if file_path in parsed and pending.get(file_path, 0) == 0 and file_path not in failed:
+                pending.pop(file_path, None)
+                parsed.discard(file_path)
+                completed.append(file_path)
+
+        def fail(file_paths, error):
+            with lock:
+                for file_path in file_paths:
+                    failed.setdefault(file_path, str(error))
+                    pending.pop(file_path, None)
+                    parsed.discard(file_path)
+
+        def embed_stage():
+            embedding_fn = self._vector_store.embedding_fn
+            while (batch := embed_queue.get()) is not _STOP:
+                try:
+                    t0 = time.perf_counter()
+                    embeddings = embedding_fn.embed_documents([doc.page_content for _, doc, _ in batch])
+                    elapsed = time.perf_counter() - t0
+                    timings["embed"] += elapsed
+                    observe_ingest("embed", elapsed)
+                    write_queue.put((batch, embeddings))
+                except Exception as e:
+                    print(f"Embedding stage failed on a batch of {len(batch)} chunks: {e}")
+                    fail({file_path for file_path, _, _ in batch}, e)
+            write_queue.put(_STOP)
+
+        def write_stage():
+            while (item := write_queue.get()) is not _STOP:
+                batch, embeddings = item
+                try:
+                    t0 = time.perf_counter()
+                    self._vector_store.add_embeddings(
+                        [doc for _, doc, _ in batch], embeddings, [id_ for _, _, id_ in batch]
+                    )
+                    elapsed = time.perf_counter() - t0
+                    timings["insert"] += elapsed
+                    observe_ingest("insert", elapsed)
+                    INGESTED_CHUNKS_TOTAL.inc(len(batch))
+                    progress("chunks_written", len(batch))
+                except Exception as e:
+                    print(f"Writer stage failed on a batch of {len(batch)} chunks: {e}")
+                    fail({file_path for file_path, _, _ in batch}, e)
+                    continue
+                with lock:
+                    for file_path, _, _ in batch:
+                        if file_path in pending:
+                            pending[file_path] -= 1
+                            maybe_complete(file_path)
+
+        threads = [threading.Thread(target=embed_stage, daemon=True), threading.Thread(target=write_stage, daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        buffer = []
+
+        def on_chunks(file_path, chunks, pages_read, load_s, split_s):
+            nonlocal buffer
+            timings["load"] += load_s
+            timings["split"] += split_s
+            observe_ingest("load", load_s)
+            observe_ingest("split", split_s)
+            progress("pages", pages_read)
+            progress("chunks", len(chunks))
+            if file_path in failed:
+                return
+            docs, ids = prepare(file_path, chunks)
+            with lock:
+                pending[file_path] = pending.get(file_path, 0) + len(docs)
+            for doc, id_ in zip(docs, ids):
+                buffer.append((file_path, doc, id_))
+                if len(buffer) >= self._batch_size:
+                    embed_queue.put(buffer) # Blocks while the embedding stage is behind
+                    buffer = []
+
+        def on_done(file_path):
+            if file_path in failed:
+                return
+            finish(file_path)
+            with lock:
+                parsed.add(file_path)
+                maybe_complete(file_path)
+
+        def on_failed(file_path, error):
+            print(f"Failed to process {file_path}: {error}")
+            fail([file_path], error)
+
+        try:
+            if self._workers == 1 or len(file_paths) == 1:
+                # Not worth paying for process start-up
+                for file_path in file_paths:
+                    try:
+                        for chunks, pages_read, load_s, split_s in iter_file_batches(
+                            file_path, self._chunk_size, self._chunk_overlap, self._batch_size
+                        ):
+                            on_chunks(file_path, chunks, pages_read, load_s, split_s)
+                        on_done(file_path)
+                    except Exception as e:
+                        on_failed(file_path, e)
+            elif file_paths:
+                self._run_pool(file_paths, on_chunks, on_done, on_failed)
+            if buffer:
+                embed_queue.put(buffer)
+        finally:
+            embed_queue.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+        timings["total"] = time.perf_counter() - start
+        print("Ingestion stage timings (s): " + ", ".join(f"{k}={v:.2f}" for k, v in timings.items()))
+        return {"completed": completed, "failed": failed, "timings": timings}
+
+    def _run_pool(self, file_paths, on_chunks, on_done, on_failed):
+        """Fan files out to worker processes and consume their chunk batches as they arrive."""
+        # spawn, not fork: the parent may already hold torch/Milvus threads
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=self._workers, mp_context=context) as pool:
+            out_queue = manager.Queue(maxsize=self._queue_depth)
+            futures = {
+                pool.submit(stream_file, file_path, self._chunk_size, self._chunk_overlap, self._batch_size, out_queue): file_path
+                for file_path in file_paths
+            }
+            remaining = set(file_paths)
+            while remaining:
+                try:
+                    file_path, kind, payload = out_queue.get(timeout=1.0)
+                except queue.Empty:
+                    # A worker that died without reporting (e.g. a crashed process) would hang us
+                    for future, file_path in futures.items():
+                        if file_path in remaining and future.done() and future.exception() is not None:
+                            remaining.discard(file_path)
+                            on_failed(file_path, future.exception())
+                    continue
+                try:
+                    if kind == _CHUNKS:
+                        on_chunks(file_path, *payload)
+                    elif kind == _DONE:
+                        remaining.discard(file_path)
+                        on_done(file_path)
+                    else:
+                        remaining.discard(file_path)
+                        on_failed(file_path, payload)
+                except Exception as e:
+                    on_failed(file_path, e)
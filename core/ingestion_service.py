@@ -1,26 +1,216 @@
 # core/ingestion_service.py
 import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from core.document_loader import DocumentLoader
+import time
+from typing import List, Optional
+from core.config import config
+from core.ingestion_pipeline import IngestionPipeline, ProgressFn
+from core.manifest import IngestionManifest, hash_file, chunk_ids, ingestion_settings
+from data_access.bm25_index import BM25Index
 from data_access.vector_store import VectorStore
 
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+INDEX_ACTIONS = ("rebuild", "compact", "flush")
+
 class IngestionService:
-    def __init__(self, vector_store: VectorStore):
+    def __init__(self, vector_store: VectorStore, lexical_index: Optional[BM25Index] = None):
+        """`lexical_index` is kept in step with the vector store for hybrid search."""
         self._vector_store = vector_store
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        self._lexical_index = lexical_index
+        self.pipeline = IngestionPipeline(vector_store, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    def _delete(self, ids: List[str]):
+        self._vector_store.delete(ids)
+        if self._lexical_index is not None:
+            self._lexical_index.delete(ids)
+
+    def _backfill_lexical_index(self, manifest: IngestionManifest):
+        """Builds a missing BM25 index from chunks already in the vector store."""
+        ids = [id_ for file_path in manifest.files for id_ in manifest.get(file_path)["chunks"]]
+        print(f"No BM25 index found, indexing {len(ids)} existing chunk(s).")
+        batch_size = config.ingestion.batch_size
+        for start in range(0, len(ids), batch_size):
+            docs = self._vector_store.get_by_ids(ids[start:start + batch_size])
+            self._lexical_index.add([doc.metadata["pk"] for doc in docs], [doc.page_content for doc in docs])
+
+    def _open_manifest(self) -> IngestionManifest:
+        manifest = IngestionManifest(settings=ingestion_settings(CHUNK_SIZE, CHUNK_OVERLAP))
+        if manifest.settings_changed:
+            # Unchanged files would otherwise keep vectors of the old model or chunks of the old splitter
+            print(f"Ingestion settings changed ({manifest.stored_settings} -> {manifest.settings}), re-ingesting from scratch.")
+            manifest.files, manifest.exists = {}, False
+        elif any(entry["chunks"] for entry in manifest.files.values()) and not self._vector_store.count():
+            # e.g. vector_db was switched to another backend: every file must be ingested again
+            print("The ingestion manifest lists chunks but the vector store is empty, re-ingesting from scratch.")
+            manifest.files, manifest.exists = {}, False
+        elif not manifest.exists:
+            print("No ingestion manifest found, rebuilding the collection from scratch.")
+        if not manifest.exists:
+            # Rows not tracked by this manifest cannot be diffed, start clean
+            self._vector_store.reset()
+            if self._lexical_index is not None:
+                self._lexical_index.reset()
+        elif self._lexical_index is not None and not self._lexical_index.exists:
+            self._backfill_lexical_index(manifest)
+        return manifest
+
+    @staticmethod
+    def _manifest_paths(manifest: IngestionManifest, file_paths: List[str]) -> List[str]:
+        """
+        Spells each path the way the manifest already knows it, so the same file reached
+        through "Files", "./Files/" or "/abs/Files" is diffed against its entry.
+        """
+        known = {os.path.abspath(file_path): file_path for file_path in manifest.files}
+        return [known.get(os.path.abspath(file_path), file_path) for file_path in file_paths]
+
+    def _ingest(self, manifest: IngestionManifest, file_paths: List[str], report: dict, progress: Optional[ProgressFn]):
+        """
+        Ingests the given files. Files whose content hash matches the manifest are skipped;
+        for changed files only new chunks are embedded and stale chunks are deleted.
+        Changed files go through the parallel IngestionPipeline.
+        """
+        file_hashes = {}
+        file_ids = {}
+        new_ids = {}
+        id_counters = {}
+        ingested_at = int(time.time())  # Whole seconds, so MetadataFilter bounds compare exactly
+
+        def prepare(file_path, split_docs):
+            """Keep only chunks the manifest does not know yet; runs on the pipeline's producer thread."""
+            ids = chunk_ids(split_docs, seen=id_counters.setdefault(file_path, {}))
+            entry = manifest.get(file_path)
+            old_ids = set(entry["chunks"]) if entry else set()
+            new_chunks = [(doc, id_) for doc, id_ in zip(split_docs, ids) if id_ not in old_ids]
+            for doc, _ in new_chunks:
+                doc.metadata["ingested_at"] = ingested_at
+
+            file_ids.setdefault(file_path, []).extend(ids)
+            new_ids.setdefault(file_path, []).extend(id_ for _, id_ in new_chunks)
+            if self._lexical_index is not None:
+                self._lexical_index.add([id_ for _, id_ in new_chunks], [doc.page_content for doc, _ in new_chunks])
+            return [doc for doc, _ in new_chunks], [id_ for _, id_ in new_chunks]
+
+        def finish(file_path):
+            """All chunks of the file have been seen, so chunks missing from it are stale."""
+            entry = manifest.get(file_path)
+            stale_ids = set(entry["chunks"]) - set(file_ids.get(file_path, [])) if entry else set()
+            if stale_ids:
+                self._delete(list(stale_ids))
+                report["deleted"] += len(stale_ids)
+            file_ids.setdefault(file_path, [])
+            new_ids.setdefault(file_path, [])
+
+        for file_path in file_paths:
+            filename = os.path.basename(file_path)
+            try:
+                file_hash = hash_file(file_path)
+            except Exception as e:
+                print(f"Failed to process {filename}: {e}") # Graceful error handling [cite: 32]
+                report["failed"].append(filename)
+                report["errors"][filename] = str(e)
+                continue
+            entry = manifest.get(file_path)
+            if entry and entry["sha256"] == file_hash:
+                report["skipped"].append(filename)
+            else:
+                file_hashes[file_path] = file_hash
 
-    def ingest_directory(self, dir_path: str):
+        print(f"Processing {len(file_hashes)} new or changed file(s).")
+        result = self.pipeline.run(list(file_hashes), prepare, finish, progress)
+        report["timings"] = result["timings"]
+
+        for file_path in result["completed"]:
+            manifest.update(file_path, file_hashes[file_path], file_ids[file_path])
+            report["ingested"].append(os.path.basename(file_path))
+            report["added"] += len(new_ids[file_path])
+        for file_path, error in result["failed"].items():
+            # Roll back partially written chunks so a retry does not duplicate them
+            if new_ids.get(file_path):
+                self._delete(new_ids[file_path])
+            report["failed"].append(os.path.basename(file_path))
+            report["errors"][os.path.basename(file_path)] = error
+
+    def _save(self, manifest: IngestionManifest, report: dict):
+        manifest.save()
+        if self._lexical_index is not None:
+            self._lexical_index.save()
+        # Seal everything written in this run at once instead of once per file
+        report["insert"] = self._vector_store.flush()
+
+    @staticmethod
+    def _new_report() -> dict:
+        return {"skipped": [], "ingested": [], "removed": [], "failed": [], "errors": {}, "added": 0, "deleted": 0}
+
+    def ingest_directory(self, dir_path: str, progress: Optional[ProgressFn] = None) -> dict:
+        """
+        Incrementally ingests a directory (see _ingest). Files that disappeared from the
+        directory have all their chunks deleted.
+        """
         print(f"Starting ingestion from directory: {dir_path}")
-        for filename in os.listdir(dir_path):
-            file_path = os.path.join(dir_path, filename)
-            if os.path.isfile(file_path):
-                try:
-                    print(f"Processing file: {filename}")
-                    loader = DocumentLoader(file_path)
-                    documents = loader.load()
-                    
-                    split_docs = self.text_splitter.split_documents(documents)
-                    self._vector_store.add_documents(split_docs)
-                except Exception as e:
-                    print(f"Failed to process {filename}: {e}") # Graceful error handling [cite: 32]
-        print("Directory ingestion complete.")
\ No newline at end of file
+        manifest = self._open_manifest()
+        report = self._new_report()
+        try:
+            file_paths = self._manifest_paths(manifest, [
+                os.path.join(dir_path, filename) for filename in sorted(os.listdir(dir_path))
+                if os.path.isfile(os.path.join(dir_path, filename))
+            ])
+            self._ingest(manifest, file_paths, report, progress)
+
+            # Files that were ingested from this directory before but are gone now. Directories
+            # are compared absolute, so "Files", "./Files/" and "/abs/Files" are the same one
+            directory = os.path.abspath(dir_path)
+            seen = set(file_paths)
+            for file_path in list(manifest.files):
+                if os.path.dirname(os.path.abspath(file_path)) == directory and file_path not in seen:
+                    stale_ids = manifest.get(file_path)["chunks"]
+                    if stale_ids:
+                        self._delete(stale_ids)
+                    manifest.remove(file_path)
+                    report["removed"].append(os.path.basename(file_path))
+                    report["deleted"] += len(stale_ids)
+        finally:
+            self._save(manifest, report)
+
+        print(
+            f"Directory ingestion complete. Skipped {len(report['skipped'])} unchanged file(s), "
+            f"added {report['added']} chunk(s), deleted {report['deleted']} chunk(s)."
+        )
+        return report
+
+    def ingest_files(self, file_paths: List[str], progress: Optional[ProgressFn] = None) -> dict:
+        """
+        Incrementally ingests only the given files (e.g. uploads), leaving every other
+        file in the collection alone.
+        """
+        print(f"Starting ingestion of {len(file_paths)} file(s).")
+        manifest = self._open_manifest()
+        report = self._new_report()
+        try:
+            self._ingest(manifest, self._manifest_paths(manifest, file_paths), report, progress)
+        finally:
+            self._save(manifest, report)
+
+        print(
+            f"File ingestion complete. Skipped {len(report['skipped'])} unchanged file(s), "
+            f"added {report['added']} chunk(s), deleted {report['deleted']} chunk(s)."
+        )
+        return report
+
+    def maintain_index(self, action: str) -> dict:
+        """
+        Runs an index maintenance action (see INDEX_ACTIONS) and returns its result with
+        the index stats afterwards. Compaction also drops deleted chunks from the BM25 index.
+        """
+        if action not in INDEX_ACTIONS:
+            raise ValueError(f"Unknown index action '{action}', expected one of {list(INDEX_ACTIONS)}.")
+        print(f"Starting index {action}.")
+        if action == "rebuild":
+            result = self._vector_store.rebuild_index()
+        elif action == "compact":
+            result = self._vector_store.compact()
+            if self._lexical_index is not None:
+                self._lexical_index.compact()
+                self._lexical_index.save()
+        else:
+            result = self._vector_store.flush()
+        return {"action": action, **result, "index": self._vector_store.index_stats()}
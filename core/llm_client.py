@@ -0,0 +1,254 @@
+# core/llm_client.py
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
+from core.config import GenerationLLMConfig
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseLLM
+
+CANCEL_POLL_SECONDS = 0.1 # How often a waiting stream checks whether its reader went away
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when generation_llm.max_pending generations are already queued or running."""
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when a generation does not finish within generation_llm.timeout_seconds."""
+
+class LLMBackend(ABC):
+    """A provider that streams completion tokens for a prompt."""
+    name = "base"
+
+    @abstractmethod
+    def stream(self, prompt: str, cancelled: Callable[[], bool]) -> Iterator[str]:
+        """Yield tokens; stop early (and release the request) once cancelled() is true."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class OllamaBackend(LLMBackend):
+    """
+    Streams from Ollama's /api/generate over a persistent httpx connection pool, so
+    connections are kept alive across queries instead of being opened per request.
+    Connection errors and 5xx responses are retried while no token has been produced yet.
+    """
+    name = "ollama"
+
+    def __init__(self, llm_config: GenerationLLMConfig):
+        import httpx
+        self._httpx = httpx
+        self.config = llm_config
+        self._client = httpx.Client(
+            base_url=llm_config.base_url,
+            timeout=httpx.Timeout(llm_config.timeout_seconds, connect=llm_config.connect_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=llm_config.max_concurrency,
+                max_keepalive_connections=llm_config.max_concurrency,
+            ),
+        )
+
+    def stream(self, prompt: str, cancelled: Callable[[], bool]) -> Iterator[str]:
+        payload = {
+            "model": self.config.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.config.keep_alive,
+            "options": {"temperature": self.config.temperature, "num_predict": self.config.max_tokens},
+        }
+        for attempt in range(self.config.retries + 1):
+            produced = False
+            try:
+                with self._client.stream("POST", "/api/generate", json=payload) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if cancelled():
+                            # Leaving the block closes the connection, which stops the generation
+                            return
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        if data.get("error"):
+                            raise RuntimeError(f"Ollama error: {data['error']}")
+                        if data.get("response"):
+                            produced = True
+                            yield data["response"]
+                        if data.get("done"):
+                            return
+                return
+            except (self._httpx.TransportError, self._httpx.HTTPStatusError) as e:
+                retriable = isinstance(e, self._httpx.TransportError) or e.response.status_code >= 500
+                if produced or not retriable or attempt == self.config.retries:
+                    raise
+                print(f"Ollama request failed ({e}), retrying ({attempt + 1}/{self.config.retries}).")
+                time.sleep(0.5 * 2 ** attempt)
+
+    def close(self):
+        self._client.close()
+
+class StubBackend(LLMBackend):
+    """
+    Offline stand-in for load tests: streams a fixed answer word by word after stub.ttft_ms,
+    at stub.tokens_per_second, without any network or model.
+    """
+    name = "stub"
+
+    def __init__(self, llm_config: GenerationLLMConfig):
+        self.config = llm_config.stub
+
+    def stream(self, prompt: str, cancelled: Callable[[], bool]) -> Iterator[str]:
+        # Wait out the time to first token in slices, so a cancelled request frees its worker
+        ttft_end = time.monotonic() + self.config.ttft_ms / 1000
+        while (remaining := ttft_end - time.monotonic()) > 0:
+            if cancelled():
+                return
+            time.sleep(min(remaining, CANCEL_POLL_SECONDS))
+        delay = 1 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0
+        for i, word in enumerate(self.config.response.split(" ")):
+            if cancelled():
+                return
+            if i:
+                time.sleep(delay)
+            yield word if i == 0 else " " + word
+
+class LangChainBackend(LLMBackend):
+    """Adapts any LangChain LLM, e.g. a fake LLM in the benchmark."""
+    name = "langchain"
+
+    def __init__(self, llm: "BaseLLM"):
+        self._llm = llm
+
+    def stream(self, prompt: str, cancelled: Callable[[], bool]) -> Iterator[str]:
+        for token in self._llm.stream(prompt):
+            if cancelled():
+                return
+            yield token
+
+# generation_llm.provider -> backend
+PROVIDERS: Dict[str, Callable[[GenerationLLMConfig], LLMBackend]] = {
+    "ollama": OllamaBackend,
+    "stub": StubBackend,
+}
+
+def create_backend(llm_config: GenerationLLMConfig) -> LLMBackend:
+    if llm_config.provider not in PROVIDERS:
+        raise ValueError(f"Unknown generation_llm.provider '{llm_config.provider}', expected one of {list(PROVIDERS)}.")
+    return PROVIDERS[llm_config.provider](llm_config)
+
+class _Flight:
+    """One generation shared by every caller that sent the same prompt while it was running."""
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.cond = threading.Condition()
+
+class LLMClient:
+    """
+    Runs generations on a fixed pool of generation_llm.max_concurrency workers. Beyond
+    max_pending queued or running generations new ones are rejected (LLMOverloadedError).
+    Callers sending an identical prompt while it is in flight share its token stream
+    instead of starting another generation. A generation is cancelled once every caller
+    has stopped reading it, and callers give up once no token arrived for timeout_seconds
+    (LLMTimeoutError), however long the whole generation takes.
+    """
+    def __init__(self, backend: LLMBackend, max_concurrency: int, max_pending: int, timeout_seconds: float):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="llm")
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"generations": 0, "coalesced": 0, "rejected": 0, "timeouts": 0, "cancelled": 0, "errors": 0}
+
+    def _run(self, key: str, prompt: str, flight: _Flight):
+        try:
+            if not flight.cancelled:
+                for token in self.backend.stream(prompt, lambda: flight.cancelled):
+                    with flight.cond:
+                        flight.tokens.append(token)
+                        flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+        finally:
+            with self._lock:
+                # A cancelled flight may already have been replaced by a newer one for the same prompt
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _join(self, prompt: str) -> _Flight:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.cancelled:
+                self._stats["coalesced"] += 1
+            else:
+                if len(self._flights) >= self.max_pending:
+                    self._stats["rejected"] += 1
+                    raise LLMOverloadedError(f"Too many pending generations ({len(self._flights)}), try again later.")
+                flight = self._flights[key] = _Flight()
+                self._stats["generations"] += 1
+                self._executor.submit(self._run, key, prompt, flight)
+            flight.subscribers += 1
+        return flight
+
+    def stream(self, prompt: str, cancelled: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """
+        Tokens of the prompt's generation as they arrive. The stream ends early once
+        `cancelled()` is true, checked at least every CANCEL_POLL_SECONDS while waiting.
+        """
+        flight = self._join(prompt)
+        deadline = time.monotonic() + self.timeout_seconds
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    while position == len(flight.tokens) and not flight.done:
+                        if cancelled is not None and cancelled():
+                            return
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            with self._lock:
+                                self._stats["timeouts"] += 1
+                            raise LLMTimeoutError(f"No token generated within {self.timeout_seconds}s.")
+                        flight.cond.wait(remaining if cancelled is None else min(remaining, CANCEL_POLL_SECONDS))
+                    tokens = flight.tokens[position:]
+                    finished = flight.done
+                if tokens:
+                    # An idle timeout: a long generation is fine as long as tokens keep coming
+                    deadline = time.monotonic() + self.timeout_seconds
+                position += len(tokens)
+                yield from tokens
+                if finished and position == len(flight.tokens):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and not flight.done:
+                    # Nobody is reading any more (client disconnected or timed out): stop generating
+                    flight.cancelled = True
+                    self._stats["cancelled"] += 1
+
+    def invoke(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
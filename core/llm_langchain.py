@@ -0,0 +1,26 @@
+# core/llm_langchain.py
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from core.llm_client import LLMClient
+
+class ClientLLM(LLM):
+    """Exposes an LLMClient as a LangChain LLM, so LangChain chains share its pool and limits."""
+    client: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"llm-client-{self.client.backend.name}"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return self.client.invoke(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        for token in self.client.stream(prompt):
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield GenerationChunk(text=token)
+
+def as_langchain_llm(client: LLMClient) -> ClientLLM:
+    return ClientLLM(client=client)
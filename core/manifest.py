@@ -0,0 +1,98 @@
+# core/manifest.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+from langchain_core.documents import Document
+from core.config import config
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def default_manifest_path() -> Path:
+    """Manifest lives next to the Milvus db, e.g. persisted_docs.db -> persisted_docs.manifest.json"""
+    db_path = Path(config.persisted_db_uri)
+    return db_path.with_name(f"{db_path.stem}.manifest.json")
+
+def hash_file(file_path: str) -> str:
+    """Return the sha256 of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_ids(documents: List[Document], seen: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Content-addressed ids for split chunks. The id covers source, page and text,
+    so an unchanged chunk keeps its id across re-ingests. Repeated chunks within
+    the same file get an ordinal suffix to stay unique; pass the same `seen` dict
+    when a file's chunks are hashed in several batches.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for doc in documents:
+        key = "\x00".join([
+            str(doc.metadata.get("source", "")),
+            str(doc.metadata.get("page_number", "")),
+            doc.page_content,
+        ])
+        chunk_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        count = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = count + 1
+        ids.append(chunk_hash if count == 0 else f"{chunk_hash}-{count}")
+    return ids
+
+def ingestion_settings(chunk_size: int, chunk_overlap: int) -> dict:
+    """Settings that determine the stored chunks and their vectors."""
+    backend = config.inference.embedding
+    return {
+        "embedding_model": config.embedding_model_name,
+        "embedding_backend": backend.backend,
+        "onnx_file_name": backend.onnx_file_name,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+
+class IngestionManifest:
+    """
+    Persisted record of the file hash and chunk ids last ingested for each file, and of
+    the ingestion `settings` they were produced with (see ingestion_settings).
+    """
+
+    def __init__(self, path: Optional[Path] = None, settings: Optional[dict] = None):
+        self.path = Path(path) if path else default_manifest_path()
+        self.settings = settings
+        self.files: Dict[str, dict] = {}
+        self.exists = self.path.exists()
+        self.stored_settings: Optional[dict] = None
+        if self.exists:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.stored_settings = data.get("settings")
+
+    @property
+    def settings_changed(self) -> bool:
+        """Whether the stored chunks were made with other settings (or by a version that did not record them)."""
+        return self.exists and self.settings is not None and self.stored_settings != self.settings
+
+    def get(self, file_path: str) -> Optional[dict]:
+        return self.files.get(file_path)
+
+    def update(self, file_path: str, file_hash: str, ids: List[str]):
+        self.files[file_path] = {"sha256": file_hash, "chunks": ids}
+
+    def remove(self, file_path: str) -> List[str]:
+        """Drop a file from the manifest and return the chunk ids it owned."""
+        entry = self.files.pop(file_path, None)
+        return entry["chunks"] if entry else []
+
+    def save(self):
+        """Write atomically so a crash mid-ingest never leaves a truncated manifest."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"settings": self.settings, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+        self.stored_settings = self.settings
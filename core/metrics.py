@@ -0,0 +1,134 @@
+# core/metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List
+from core.config import config
+
+# Seconds; covers cache hits (ms) up to slow LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _labels(labels: tuple) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+class Histogram:
+    """Prometheus-style histogram with fixed buckets, one series per label set."""
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_labels(key)} {series['count']}")
+        return lines
+
+class Counter:
+    """Monotonic counter, one series per label set."""
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_labels(key)} {value}" for key, value in sorted(self._series.items())]
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+
+    def histogram(self, name: str, help_text: str) -> Histogram:
+        metric = Histogram(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, prefix: str, collect: Callable[[], dict]):
+        """Export the numeric values of collect() as gauges named <prefix>_<key> at scrape time."""
+        self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for prefix, collect in self._collectors.items():
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    lines += [f"# TYPE {prefix}_{key} gauge", f"{prefix}_{key} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+QUERY_STAGE_SECONDS = registry.histogram("rag_query_stage_seconds", "Latency of each query stage in seconds.")
+INGEST_STAGE_SECONDS = registry.histogram("rag_ingest_stage_seconds", "Latency of each ingestion stage per batch in seconds.")
+QUERIES_TOTAL = registry.counter("rag_queries_total", "Queries answered, by path.")
+RERANK_PATH_TOTAL = registry.counter("rag_rerank_path_total", "Reranked queries, by cascade path.")
+INGESTED_CHUNKS_TOTAL = registry.counter("rag_ingested_chunks_total", "Chunks written to the vector store.")
+
+def observe_ingest(stage: str, seconds: float):
+    if config.metrics.enabled:
+        INGEST_STAGE_SECONDS.observe(seconds, stage=stage)
+
+class Trace:
+    """
+    Stage timings for a single query. Observed into QUERY_STAGE_SECONDS when metrics are
+    enabled, and kept in `stages` when record=True (the opt-in per-request breakdown).
+    When neither applies, stage() is a no-op context manager.
+    """
+    def __init__(self, record: bool = False):
+        self.record = record
+        self.stages: Dict[str, float] = {}
+        self._active = record or config.metrics.enabled
+
+    def stage(self, name: str):
+        return self._timer(name) if self._active else nullcontext()
+
+    @contextmanager
+    def _timer(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float):
+        if config.metrics.enabled:
+            QUERY_STAGE_SECONDS.observe(seconds, stage=name)
+        if self.record:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
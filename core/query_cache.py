@@ -0,0 +1,122 @@
+# core/query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings share a key."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+class QueryCache:
+    """
+    Two-tier cache of answered queries.
+    1. Exact tier: keyed on the normalized query text.
+    2. Semantic tier: cosine similarity between query embeddings, hit when >= similarity_threshold.
+    Entries are evicted LRU-first once max_entries or max_bytes is exceeded, expire after
+    ttl_seconds, and are all dropped when the vector store generation changes (i.e. after ingestion).
+    """
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self._generation = None
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _sync_generation(self, generation: int):
+        # Caller holds the lock
+        if self._generation != generation:
+            if self._entries:
+                self._counters["invalidations"] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def _expired(self, entry: dict) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - entry["created"] > self.ttl_seconds
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def get(self, query: str, generation: int) -> Optional[dict]:
+        """Exact-tier lookup. Does not count a miss, since the semantic tier may still hit."""
+        key = normalize_query(query)
+        with self._lock:
+            self._sync_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            self._counters["exact_hits"] += 1
+            return entry["result"]
+
+    def get_similar(self, embedding: List[float], generation: int) -> Optional[dict]:
+        """Semantic-tier lookup; counts a miss when nothing is close enough."""
+        with self._lock:
+            self._sync_generation(generation)
+            for key in [k for k, e in self._entries.items() if self._expired(e)]:
+                self._pop(key)
+            if self._entries and self.similarity_threshold <= 1.0:
+                keys = list(self._entries)
+                matrix = np.vstack([self._entries[k]["embedding"] for k in keys])
+                similarities = matrix @ self._unit(embedding)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self._entries.move_to_end(keys[best])
+                    self._counters["semantic_hits"] += 1
+                    return self._entries[keys[best]]["result"]
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, query: str, embedding: List[float], result: dict, generation: int):
+        key = normalize_query(query)
+        vector = self._unit(embedding)
+        # Rough footprint: answer and sources text plus the stored vector
+        size = len(str(result)) + vector.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # Computed against a collection that has changed since; do not cache it
+                return
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = {"result": result, "embedding": vector, "created": time.monotonic(), "size": size}
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
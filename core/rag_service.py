@@ -1,21 +1,83 @@
 # core/rag_service.py
-from langchain_classic.chains import LLMChain
-from langchain_ollama.llms import OllamaLLM
-from langchain_classic.chains import RetrievalQA
-from langchain_classic.prompts import PromptTemplate
+import asyncio
+import threading
+import time
+from collections import deque
+import numpy as np
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from data_access.vector_store import VectorStore
 from core.config import config
-import torch
-from sentence_transformers import CrossEncoder
+from core.context import MIN_SEGMENT_TOKENS, get_token_counter, pack_context, truncate_tokens
+from core.inference import load_cross_encoder
+from core.llm_client import LangChainBackend, LLMClient, create_backend
+from core.metrics import QUERIES_TOTAL, RERANK_PATH_TOTAL, Trace
+from core.query_cache import QueryCache
+from core.reranker import BatchingReranker, chunk_key
+from core.sessions import SUMMARY_PROMPT, Session, SessionStore, format_turns
+from data_access.bm25_index import BM25Index
+from data_access.filters import MetadataFilter
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseLLM
+
+# How many more BM25 hits a filtered query fetches, since those outside the filter are dropped
+FILTERED_LEXICAL_OVERSAMPLE = 4
+
+class QueryOverloadedError(RuntimeError):
+    """Raised when more queries are pending than query.max_pending allows."""
 
 class RAGService:
-    def __init__(self, vector_store: VectorStore):
+    def __init__(self, vector_store: VectorStore, llm: Optional["BaseLLM"] = None, lexical_index: Optional[BM25Index] = None):
+        """
+        `llm` overrides the configured generation_llm provider with a LangChain LLM, e.g. a
+        deterministic fake for benchmarks; it still runs through the pooled LLMClient.
+        `lexical_index` enables hybrid (BM25 + vector) candidate retrieval when hybrid_search.enabled.
+        """
+        # Imported here rather than at module level so the API can start without them
+        from langchain_classic.chains import RetrievalQA
+        from langchain_classic.prompts import PromptTemplate
+        from core.llm_langchain import as_langchain_llm
+
         self._vector_store = vector_store
-        self._llm = OllamaLLM(
-            model=config.generation_llm.model,
-            temperature=config.generation_llm.temperature,
-            num_predict=config.generation_llm.max_tokens,
+        self._lexical_index = lexical_index
+        # Embedding, Milvus search, reranking and waiting on the LLM are all blocking, so
+        # async callers run them here instead of on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.query.max_concurrency,
+            thread_name_prefix="rag-query"
+        )
+        # Batch LLM calls get their own pool so a large batch cannot starve single queries
+        self._batch_llm_executor = ThreadPoolExecutor(
+            max_workers=config.query.batch_llm_concurrency,
+            thread_name_prefix="rag-batch-llm"
+        )
+        self._pending = 0
+        cache_config = config.query_cache
+        self._cache = QueryCache(
+            max_entries=cache_config.max_entries,
+            max_bytes=cache_config.max_bytes,
+            ttl_seconds=cache_config.ttl_seconds,
+            similarity_threshold=cache_config.similarity_threshold,
+        ) if cache_config.enabled else None
+        session_config = config.sessions
+        self._sessions = SessionStore(
+            max_sessions=session_config.max_sessions,
+            max_bytes=session_config.max_bytes,
+            ttl_seconds=session_config.ttl_seconds,
         )
+        # Older turns are folded into a session's summary off the request path
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-summary")
+        llm_config = config.generation_llm
+        # Every generation goes through one client: pooled keep-alive connections, bounded
+        # concurrency, and identical in-flight prompts answered by a single generation
+        self._llm_client = LLMClient(
+            LangChainBackend(llm) if llm is not None else create_backend(llm_config),
+            max_concurrency=llm_config.max_concurrency,
+            max_pending=llm_config.max_pending,
+            timeout_seconds=llm_config.timeout_seconds,
+        )
+        self._llm = as_langchain_llm(self._llm_client)
         
         prompt_template = """
         You are a precise and knowledgeable assistant.
@@ -35,10 +97,34 @@ class RAGService:
             input_variables=["context", "question"]
         )
 
-        self._reranker = CrossEncoder(
-            config.reranker_model, 
-            max_length=512, 
-            device='mps' if torch.backends.mps.is_available() else 'cpu'
+        chat_prompt_template = """
+        You are a precise and knowledgeable assistant in a conversation.
+        Use ONLY the provided context to answer, and if you don't know, say "I don’t know."
+        Use the conversation so far only to understand what the question refers to.
+        Keep answers concise and factual.
+
+        Conversation so far:
+        {history}
+
+        Context:
+        {context}
+
+        Question:
+        {question}
+
+        Answer:"""
+
+        self.chat_prompt = PromptTemplate(
+            template=chat_prompt_template,
+            input_variables=["history", "context", "question"]
+        )
+
+        # Pairs from concurrent queries are merged into shared CrossEncoder batches
+        self._reranker = BatchingReranker(
+            load_cross_encoder(config.reranker_model, max_length=512),
+            batch_size=config.reranker.batch_size,
+            max_wait_ms=config.reranker.max_wait_ms,
+            cache_size=config.reranker.cache_size,
         )
         self.prompt = prompt
         
@@ -50,53 +136,435 @@ class RAGService:
             return_source_documents=True
         )
 
-    def answer_query_reranked(self, query: str) -> dict:
+    def _retrieve_reranked(
+        self, query: str, embedding: Optional[List[float]] = None, trace: Optional[Trace] = None, top_k: Optional[int] = None,
+        search_filter: Optional[MetadataFilter] = None,
+    ) -> Tuple[list, dict]:
+        """
+        Vector (and BM25) search for candidates, then keep the top_k (default top_k_ranking)
+        after the rerank cascade. Returns the reranked docs and the cascade report.
+        With a `search_filter` only matching chunks are candidates.
+        """
+        trace = trace or Trace()
+        if embedding is None:
+            with trace.stage("embed"):
+                embedding = self._vector_store.embedding_fn.embed_query(query)
+        with trace.stage("vector_search"):
+            retrieved_docs_with_scores = self._vector_store.similarity_search_batch(
+                [embedding],
+                k=config.top_k_retrieval,
+                search_filter=search_filter,
+            )[0]
 
-        retrieved_docs_with_scores = self._vector_store._client.similarity_search_with_score(
-            query, 
-            k=config.top_k_retrieval 
-        )
+        retrieved_docs_with_scores = self._hybrid_candidates(query, retrieved_docs_with_scores, trace, search_filter)
 
         if not retrieved_docs_with_scores:
             print("No documents found by vector store.")
-            return {"answer": "I don't know.", "sources": []}
-        
-        pairs = [(query, doc.page_content) for doc, score in retrieved_docs_with_scores]
-        
-        # Run the reranker model. This is computationally more expensive but more accurate.
-        print(f"Reranking {len(pairs)} documents...")
-        
-        rerank_scores = self._reranker.predict(pairs, show_progress_bar=False)
-        
-        reranked_docs = list(zip(rerank_scores, retrieved_docs_with_scores))
-        # Sort by the new reranker score (highest first)
-        reranked_docs.sort(key=lambda x: x[0], reverse=True)
-        
+            return [], {"path": "none", "candidates": 0, "scored": 0}
+
+        reranked_docs, rerank_info = self._rerank(query, retrieved_docs_with_scores, trace)
         # Filter down to the final top_k_ranking (e.g., top 5)
-        final_docs_with_scores = reranked_docs[:config.top_k_ranking]
-        
-        # 3. Format the context for the LLM
-        # We now use the *best* 5 documents as context
-        context = "\n\n".join([doc.page_content for rerank_score, (doc, vector_score) in final_docs_with_scores])
-        
-        # 4. Create the LLM chain and run it
-        llm_chain = LLMChain(prompt=self.prompt, llm=self._llm)
-        answer = llm_chain.invoke({"context": context, "question": query})
+        return reranked_docs[:top_k or config.top_k_ranking], rerank_info
+
+    @staticmethod
+    def _vector_margin(candidates: list, top_k: int) -> float:
+        """
+        Gap between the top_k-th and the next best vector score, as a share of the score
+        spread over all candidates. Scores are sorted first, so the candidate order does
+        not matter; BM25-only hits (no vector score) are left out.
+        """
+        # L2 is a distance (lower is better); IP and COSINE are similarities
+        similarities = sorted(
+            (-score if config.similarity_metric == "L2" else score for _, score in candidates if score is not None),
+            reverse=True,
+        )
+        if len(similarities) <= top_k:
+            return 0.0
+        spread = similarities[0] - similarities[-1]
+        return (similarities[top_k - 1] - similarities[top_k]) / spread if spread > 0 else 0.0
+
+    @property
+    def _hybrid_enabled(self) -> bool:
+        return self._lexical_index is not None and config.hybrid_search.enabled
+
+    def _cheap_stage(self, candidates: list) -> Tuple[list, str]:
+        """
+        First stage of the rerank cascade, using only retrieval order and vector scores.
+        Returns the leading candidates worth a CrossEncoder pass and the path: "full" (all),
+        "pruned" (the first reranker.cascade.prune_keep) or "early_exit" (none, because the
+        vector ranking already separates the top_k_ranking hits from the rest). Early exit
+        is off for hybrid candidates: their order is the fused one, not the vector one.
+        """
+        cascade = config.reranker.cascade
+        top_k = config.top_k_ranking
+        if not candidates:
+            return [], "none"
+        if not cascade.enabled:
+            return candidates, "full"
+        if not self._hybrid_enabled and (
+            len(candidates) <= top_k or self._vector_margin(candidates, top_k) >= cascade.early_exit_margin
+        ):
+            return [], "early_exit"
+        if 0 < cascade.prune_keep < len(candidates):
+            return candidates[:max(cascade.prune_keep, top_k)], "pruned"
+        return candidates, "full"
+
+    @staticmethod
+    def _rank(candidates: list, scores: list, path: str) -> Tuple[list, dict]:
+        """
+        Scored candidates by CrossEncoder score (highest first), followed by the unscored
+        rest in retrieval order with a score of None.
+        """
+        reranked_docs = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
+        reranked_docs += [(None, candidate) for candidate in candidates[len(scores):]]
+        RERANK_PATH_TOTAL.inc(path=path)
+        return reranked_docs, {"path": path, "candidates": len(candidates), "scored": len(scores)}
+
+    def _rerank(self, query: str, candidates: list, trace: Trace) -> Tuple[list, dict]:
+        """
+        Rerank cascade: the cheap stage prunes (or skips) candidates, then the CrossEncoder
+        scores the survivors. With reranker.cascade.latency_budget_ms set, survivors are scored
+        a few at a time in retrieval order and scoring stops once the budget is spent (path "budget").
+        """
+        survivors, path = self._cheap_stage(candidates)
+        scores = []
+        if survivors:
+            # Run the reranker model. This is computationally more expensive but more accurate.
+            print(f"Reranking {len(survivors)} of {len(candidates)} documents...")
+            budget = config.reranker.cascade.latency_budget_ms / 1000
+            step = max(1, config.reranker.cascade.budget_step) if budget > 0 else len(survivors)
+            t0 = time.perf_counter()
+            with trace.stage("rerank"):
+                for start in range(0, len(survivors), step):
+                    if scores and time.perf_counter() - t0 > budget:
+                        path = "budget"
+                        break
+                    scores.extend(self._reranker.predict(query, [doc for doc, _ in survivors[start:start + step]]))
+        return self._rank(candidates, scores, path)
+
+    def _hybrid_candidates(
+        self, query: str, retrieved_docs_with_scores: list, trace: Trace, search_filter: Optional[MetadataFilter] = None
+    ) -> list:
+        """
+        Reciprocal rank fusion of the vector hits with BM25 hits, cut to hybrid_search.rerank_candidates.
+        Returns (doc, vector score) pairs; chunks found only by BM25 have a vector score of None.
+        """
+        hybrid = config.hybrid_search
+        if not self._hybrid_enabled:
+            return retrieved_docs_with_scores
+        with trace.stage("lexical_search"):
+            # The BM25 index has no metadata, so a filtered search over-fetches and drops non-matching hits
+            lexical_k = hybrid.lexical_k * (FILTERED_LEXICAL_OVERSAMPLE if search_filter is not None else 1)
+            lexical_hits = self._lexical_index.search(query, lexical_k)
+
+        candidates = {}
+        fused = {}
+        for rank, (doc, score) in enumerate(retrieved_docs_with_scores, start=1):
+            key = chunk_key(doc)
+            candidates[key] = (doc, score)
+            fused[key] = hybrid.vector_weight / (hybrid.rrf_k + rank)
+        if search_filter is not None:
+            with trace.stage("lexical_fetch"):
+                for doc in self._vector_store.get_by_ids([chunk_id for chunk_id, _ in lexical_hits if chunk_id not in candidates]):
+                    if search_filter.matches(doc.metadata):
+                        candidates[chunk_key(doc)] = (doc, None)
+            lexical_hits = [(chunk_id, score) for chunk_id, score in lexical_hits if chunk_id in candidates][:hybrid.lexical_k]
+        for rank, (chunk_id, _) in enumerate(lexical_hits, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + hybrid.lexical_weight / (hybrid.rrf_k + rank)
+        top = sorted(fused, key=fused.get, reverse=True)[:hybrid.rerank_candidates]
+
+        missing = [key for key in top if key not in candidates]
+        if missing:
+            with trace.stage("lexical_fetch"):
+                for doc in self._vector_store.get_by_ids(missing):
+                    candidates[chunk_key(doc)] = (doc, None)
+        return [candidates[key] for key in top if key in candidates]
+
+    def retrieve(self, query: str, search_filter: Optional[MetadataFilter] = None) -> list:
+        """
+        All reranked candidates as (rerank_score, (doc, vector_score)), best first.
+        Used for offline retrieval evaluation; bypasses the query cache and the LLM.
+        """
+        reranked_docs, _ = self._retrieve_reranked(
+            query, top_k=max(config.top_k_retrieval, config.hybrid_search.rerank_candidates), search_filter=search_filter
+        )
+        return reranked_docs
+
+    def _build_prompt(self, query: str, final_docs_with_scores: list, history: Optional[str] = None) -> Tuple[str, dict]:
+        """
+        Prompt with the context packed into context.max_tokens (overlapping chunks merged,
+        most relevant first), and the conversation so far for session turns. Returns the
+        prompt and a report including its token count.
+        """
+        context, prompt_info = pack_context(final_docs_with_scores, budget=config.context.max_tokens)
+        if history is None:
+            prompt_text = self.prompt.format(context=context, question=query)
+        else:
+            prompt_text = self.chat_prompt.format(history=history, context=context, question=query)
+            prompt_info["history_tokens"] = get_token_counter().count(history)
+        prompt_info["prompt_tokens"] = get_token_counter().count(prompt_text)
+        return prompt_text, prompt_info
+
+    def _session_history(self, session: Session) -> str:
+        """
+        The running summary and the most recent turns, each within its token budget, so the
+        prompt stays the same size however long the conversation gets.
+        """
+        if session.summarizing is not None:
+            # Usually done already: it ran while the user was reading the previous answer
+            try:
+                session.summarizing.result(timeout=config.generation_llm.timeout_seconds)
+            except Exception as e:
+                print(f"Session {session.id}: summary not ready ({e}), using the previous one.")
+        counter = get_token_counter()
+        parts = []
+        if session.summary:
+            parts.append("Summary: " + truncate_tokens(session.summary, config.sessions.summary_max_tokens, counter))
+        recent, budget = [], config.sessions.history_max_tokens
+        for turn in reversed(session.turns):
+            text = format_turns([turn])
+            cost = counter.count(text)
+            if cost > budget:
+                if budget >= MIN_SEGMENT_TOKENS:
+                    recent.append(truncate_tokens(text, budget, counter))
+                break
+            recent.append(text)
+            budget -= cost
+        parts.extend(reversed(recent))
+        return "\n".join(parts) or "(none)"
+
+    def _summarize(self, session: Session, turns: List[dict]):
+        """Folds turns that left the verbatim window into the session's running summary."""
+        summary_tokens = config.sessions.summary_max_tokens
+        prompt_text = SUMMARY_PROMPT.format(
+            max_words=summary_tokens * 3 // 4,
+            summary=session.summary or "(empty)",
+            turns=format_turns(turns),
+        )
+        try:
+            summary = self._llm_client.invoke(prompt_text).strip()
+        except Exception as e:
+            print(f"Summarizing session {session.id} failed ({e}), keeping its questions only.")
+            summary = " ".join([session.summary] + [f"User asked: {turn['query']}" for turn in turns]).strip()
+        session.summary = truncate_tokens(summary, summary_tokens)
+        self._sessions.count("summaries")
+        self._sessions.update(session)
 
-        # 5. Format the output sources, including both scores
+    def _session_retrieve(
+        self, session: Session, query: str, trace: Trace, search_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[list, dict, Optional[tuple]]:
+        """
+        Retrieval for a conversational turn. A follow-up is searched together with the
+        previous question (sessions.contextualize) so references like "he" resolve. When
+        its embedding is within sessions.reuse_threshold of the query the session's chunks
+        were retrieved for, and the collection and filter have not changed since, those
+        chunks are fetched by id and reused as they were ranked, skipping search and
+        reranking. Returns the docs, the rerank report and (unit embedding, generation,
+        filter key) of a fresh retrieval, or None when the chunks were reused.
+        """
+        retrieval_query = query
+        if config.sessions.contextualize and session.turns:
+            retrieval_query = f"{session.turns[-1]['query']} {query}"
+        generation = self._vector_store.generation
+        filter_key = search_filter.key if search_filter is not None else None
+        with trace.stage("embed"):
+            embedding = self._vector_store.embedding_fn.embed_query(retrieval_query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+
+        if (
+            session.chunks and session.generation == generation and session.filter_key == filter_key
+            and float(vector @ session.embedding) >= config.sessions.reuse_threshold
+        ):
+            with trace.stage("session_reuse"):
+                docs = {doc.metadata.get("pk"): doc for doc in self._vector_store.get_by_ids([pk for pk, _, _ in session.chunks])}
+            reused = [(rerank_score, (docs[pk], vector_score)) for pk, rerank_score, vector_score in session.chunks if pk in docs]
+            if reused:
+                self._sessions.count("reused_retrievals")
+                return reused, {"path": "session_reuse", "candidates": len(reused), "scored": 0}, None
+
+        final_docs_with_scores, rerank_info = self._retrieve_reranked(retrieval_query, embedding, trace, search_filter=search_filter)
+        return final_docs_with_scores, rerank_info, (vector, generation, filter_key)
+
+    def _record_turn(self, session: Session, query: str, answer: str, final_docs_with_scores: list, retrieval: Optional[tuple]):
+        """Appends the turn; turns beyond sessions.history_turns are summarized in the background."""
+        session.turns.append({"query": query, "answer": answer})
+        session.turn_count += 1
+        if retrieval is not None:
+            session.embedding, session.generation, session.filter_key = retrieval
+            session.chunks = [
+                (doc.metadata["pk"], rerank_score, vector_score)
+                for rerank_score, (doc, vector_score) in final_docs_with_scores if "pk" in doc.metadata
+            ]
+        overflow = len(session.turns) - config.sessions.history_turns
+        if overflow > 0:
+            old_turns, session.turns = session.turns[:overflow], session.turns[overflow:]
+            session.summarizing = self._summary_executor.submit(self._summarize, session, old_turns)
+        self._sessions.update(session)
+
+    @staticmethod
+    def _format_sources(final_docs_with_scores: list) -> list:
+        """Format the output sources, including both scores."""
         sources = []
         for rerank_score, (doc, vector_score) in final_docs_with_scores:
             source_data = doc.metadata.copy() # Get metadata
             source_data["chunk_text"] = doc.page_content # Add the actual text
             source_data["vector_similarity_score"] = vector_score # The original score
-            # .item() converts numpy/torch number to a plain python float for JSON
-            source_data["relevance_score"] = rerank_score.item() 
+            # float() converts numpy/torch number to a plain python float for JSON
+            # None when the rerank cascade did not score this chunk
+            source_data["relevance_score"] = float(rerank_score) if rerank_score is not None else None
             sources.append(source_data)
-            
-        return {
-            "answer": answer.get("text", "No answer found.").strip(),
-            "sources": sources
+        return sources
+
+    def _generate(
+        self, prompt_text: str, trace: Trace, start: float, cancelled: Optional[Callable[[], bool]] = None
+    ) -> Iterator[str]:
+        """
+        Stream LLM tokens, recording time to first token (since `start`) and generation time.
+        Stops early once `cancelled()` is true.
+        """
+        first = True
+        t0 = time.perf_counter()
+        for token in self._llm_client.stream(prompt_text, cancelled):
+            if first:
+                trace.add("llm_ttft", time.perf_counter() - start)
+                first = False
+            yield token
+        trace.add("llm", time.perf_counter() - t0)
+
+    def answer_query_reranked(
+        self, query: str, embedding: Optional[List[float]] = None, trace: Optional[Trace] = None, session: Optional[Session] = None,
+        search_filter: Optional[MetadataFilter] = None,
+    ) -> dict:
+        """
+        Retrieve, rerank and generate. With a `session` the turn is answered in the context
+        of the conversation so far (see _session_retrieve and _session_history) and recorded.
+        With a `search_filter` only matching chunks are retrieved.
+        """
+        start = time.perf_counter()
+        trace = trace or Trace()
+        if session is None:
+            final_docs_with_scores, rerank_info = self._retrieve_reranked(query, embedding, trace, search_filter=search_filter)
+        else:
+            final_docs_with_scores, rerank_info, retrieval = self._session_retrieve(session, query, trace, search_filter)
+        if not final_docs_with_scores:
+            result = {"answer": "I don't know.", "sources": [], "rerank": rerank_info}
+        else:
+            # Format the context for the LLM
+            with trace.stage("prompt_build"):
+                history = self._session_history(session) if session is not None else None
+                prompt_text, prompt_info = self._build_prompt(query, final_docs_with_scores, history)
+
+            # Streamed internally so time to first token is measured on this path too
+            answer = "".join(self._generate(prompt_text, trace, start))
+
+            result = {
+                "answer": answer.strip() or "No answer found.",
+                "sources": self._format_sources(final_docs_with_scores),
+                "rerank": rerank_info,
+                "prompt": prompt_info,
+            }
+        if session is not None:
+            self._record_turn(session, query, result["answer"], final_docs_with_scores, retrieval)
+        return result
+
+    def stream_answer(
+        self, query: str, session_id: Optional[str] = None, search_filter: Optional[MetadataFilter] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[dict]:
+        """
+        Streaming variant of answer_query_reranked. Yields a "sources" event as soon as
+        reranking is done, then one "token" event per chunk produced by the LLM, and a
+        final "done" event carrying time_to_first_token, total latency and the per-stage
+        breakdown (seconds). Generation stops early once `cancelled()` is true. A session
+        answers one turn at a time: a second turn while one is in flight raises SessionBusyError.
+        """
+        if session_id is None:
+            yield from self._stream_answer(query, None, search_filter, cancelled)
+            return
+        session = self._sessions.begin_turn(session_id)
+        try:
+            yield from self._stream_answer(query, session, search_filter, cancelled)
+        finally:
+            self._sessions.end_turn(session)
+
+    def _stream_answer(
+        self, query: str, session: Optional[Session], search_filter: Optional[MetadataFilter], cancelled: Optional[Callable[[], bool]],
+    ) -> Iterator[dict]:
+        """stream_answer for a session whose turn has already begun (or no session)."""
+        start = time.perf_counter()
+        trace = Trace(record=True)
+        if session is not None:
+            yield from self._stream_reranked(query, start, trace, session=session, search_filter=search_filter, cancelled=cancelled)
+            return
+        if search_filter is not None:
+            # Cached answers are not scoped to a filter
+            yield from self._stream_reranked(query, start, trace, search_filter=search_filter, cancelled=cancelled)
+            return
+
+        cached, embedding, generation = self._cache_lookup(query, trace)
+        if cached is not None:
+            QUERIES_TOTAL.inc(path="cache")
+            yield {"event": "sources", "data": {"sources": cached["sources"]}}
+            yield {"event": "token", "data": {"text": cached["answer"]}}
+            elapsed = time.perf_counter() - start
+            trace.add("total", elapsed)
+            yield {"event": "done", "data": {"metrics": {"time_to_first_token": elapsed, "total": elapsed, "cached": True, "stages": trace.stages}}}
+            return
+        yield from self._stream_reranked(query, start, trace, embedding=embedding, generation=generation, cancelled=cancelled)
+
+    def _stream_reranked(
+        self, query: str, start: float, trace: Trace, embedding: Optional[List[float]] = None,
+        generation: Optional[int] = None, session: Optional[Session] = None, search_filter: Optional[MetadataFilter] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[dict]:
+        """
+        stream_answer past the cache: retrieval, then the sources, token and done events.
+        Each step of this generator may run on a different query pool thread; a session is
+        only touched by the one turn that has it in flight (see SessionStore.begin_turn).
+        """
+        history = None
+        if session is None:
+            final_docs_with_scores, rerank_info = self._retrieve_reranked(query, embedding, trace, search_filter=search_filter)
+        else:
+            final_docs_with_scores, rerank_info, retrieval = self._session_retrieve(session, query, trace, search_filter)
+            if final_docs_with_scores:
+                history = self._session_history(session)
+        sources = self._format_sources(final_docs_with_scores)
+        yield {"event": "sources", "data": {"sources": sources, "rerank": rerank_info}}
+
+        tokens = []
+        prompt_info = None
+        if not final_docs_with_scores:
+            tokens.append("I don't know.")
+            yield {"event": "token", "data": {"text": tokens[0]}}
+        else:
+            with trace.stage("prompt_build"):
+                prompt_text, prompt_info = self._build_prompt(query, final_docs_with_scores, history)
+            for token in self._generate(prompt_text, trace, start, cancelled):
+                tokens.append(token)
+                yield {"event": "token", "data": {"text": token}}
+
+        answer = "".join(tokens).strip()
+        if cancelled is not None and cancelled():
+            return  # Nobody is listening; a cut-off answer must not be cached or recorded
+        if session is not None:
+            self._record_turn(session, query, answer, final_docs_with_scores, retrieval)
+        elif self._cache is not None and search_filter is None:
+            self._cache.put(query, embedding, {"answer": answer, "sources": sources}, generation)
+        QUERIES_TOTAL.inc(path="stream")
+        trace.add("total", time.perf_counter() - start)
+        metrics = {
+            "time_to_first_token": trace.stages.get("llm_ttft"),
+            "total": trace.stages["total"],
+            "cached": False,
+            "stages": trace.stages,
+            "prompt": prompt_info,
         }
+        if session is not None:
+            metrics["session"] = {"id": session.id, "turn": session.turn_count}
+        print(f"Streamed answer: time to first token {metrics['time_to_first_token']}s, total {metrics['total']:.2f}s")
+        yield {"event": "done", "data": {"metrics": metrics}}
 
     def answer_query_vanilla(self, query: str) -> dict:
         response = self.rag_chain.invoke(query)
@@ -113,10 +581,292 @@ class RAGService:
         }
         # response = self.rag_chain.run(query)
         # return response
-    
-    def answer_query(self, query: str) -> dict:
-        if config.top_k_ranking > 0:
-            return self.answer_query_reranked(query)
+
+    def _cache_lookup(self, query: str, trace: Trace):
+        """
+        Returns (cached result or None, query embedding, vector store generation). The
+        embedding is computed at most once and reused for retrieval on a miss.
+        """
+        generation = self._vector_store.generation
+        if self._cache is not None and (cached := self._cache.get(query, generation)) is not None:
+            return cached, None, generation
+        with trace.stage("embed"):
+            embedding = self._vector_store.embedding_fn.embed_query(query)
+        if self._cache is not None and (cached := self._cache.get_similar(embedding, generation)) is not None:
+            return cached, embedding, generation
+        return None, embedding, generation
+
+    def answer_query(
+        self, query: str, include_timings: bool = False, session_id: Optional[str] = None, search_filter: Optional[MetadataFilter] = None
+    ) -> dict:
+        """
+        Answers a query through the cache, then the reranked or vanilla pipeline.
+        With include_timings the result carries a per-stage latency breakdown under "timings".
+        With a session_id it is a turn of that conversation, which bypasses the query cache
+        since the answer depends on the turns before it; a session answers one turn at a
+        time (SessionBusyError while another is in flight). A search_filter scopes retrieval
+        to matching chunks, also bypassing the cache.
+        """
+        start = time.perf_counter()
+        trace = Trace(record=include_timings)
+        if session_id is not None:
+            session = self._sessions.begin_turn(session_id)
+            try:
+                QUERIES_TOTAL.inc(path="session")
+                result = self.answer_query_reranked(query, trace=trace, session=session, search_filter=search_filter)
+                result["session"] = {"id": session_id, "turn": session.turn_count}
+            finally:
+                self._sessions.end_turn(session)
+            trace.add("total", time.perf_counter() - start)
+            return {**result, "timings": trace.stages} if include_timings else result
+        if search_filter is not None:
+            QUERIES_TOTAL.inc(path="filtered")
+            result = self.answer_query_reranked(query, trace=trace, search_filter=search_filter)
+            trace.add("total", time.perf_counter() - start)
+            return {**result, "timings": trace.stages} if include_timings else result
+
+        cached, embedding, generation = self._cache_lookup(query, trace)
+        if cached is not None:
+            QUERIES_TOTAL.inc(path="cache")
+            result = cached
         else:
-            return self.answer_query_vanilla(query)
-        
\ No newline at end of file
+            if config.top_k_ranking > 0:
+                QUERIES_TOTAL.inc(path="reranked")
+                result = self.answer_query_reranked(query, embedding, trace)
+            else:
+                QUERIES_TOTAL.inc(path="vanilla")
+                result = self.answer_query_vanilla(query)
+            if self._cache is not None:
+                self._cache.put(query, embedding, result, generation)
+
+        trace.add("total", time.perf_counter() - start)
+        if include_timings:
+            # Copy: cached results are shared between requests
+            return {**result, "timings": trace.stages}
+        return result
+
+    def _answer_from_docs(self, query: str, final_docs_with_scores: list, trace: Trace) -> dict:
+        """Generation step of a batch query, run on the batch LLM pool."""
+        start = time.perf_counter()
+        with trace.stage("prompt_build"):
+            prompt_text, prompt_info = self._build_prompt(query, final_docs_with_scores)
+        answer = "".join(self._generate(prompt_text, trace, start))
+        return {
+            "answer": answer.strip() or "No answer found.",
+            "sources": self._format_sources(final_docs_with_scores),
+            "prompt": prompt_info,
+        }
+
+    def _start_batch(self, queries: List[str], include_timings: bool, search_filter: Optional[MetadataFilter] = None) -> List[dict]:
+        """
+        Cache lookups, one embedding pass, one multi-vector search and one rerank request for
+        a chunk of queries. Returns per query {"path", "trace", "batch_stages", and "result"
+        or "future"}, where the future is its pending LLM call.
+        """
+        # Cached answers are not scoped to a filter
+        cache = self._cache if search_filter is None else None
+        generation = self._vector_store.generation
+        batch_trace = Trace(record=True)
+        items = [{"path": "batch", "trace": Trace(record=include_timings), "result": None} for _ in queries]
+
+        if cache is not None:
+            for query, item in zip(queries, items):
+                item["result"] = cache.get(query, generation)
+        todo = [i for i, item in enumerate(items) if item["result"] is None]
+        embedding_of = {}
+        if todo:
+            # embed_documents runs the whole chunk through the model in one forward pass
+            with batch_trace.stage("batch_embed"):
+                embedding_of = dict(zip(todo, self._vector_store.embedding_fn.embed_documents([queries[i] for i in todo])))
+            if cache is not None:
+                for i in todo:
+                    items[i]["result"] = cache.get_similar(embedding_of[i], generation)
+                todo = [i for i in todo if items[i]["result"] is None]
+        for item in items:
+            if item["result"] is not None:
+                item["path"] = "cache"
+
+        if todo:
+            with batch_trace.stage("batch_vector_search"):
+                hits = self._vector_store.similarity_search_batch([embedding_of[i] for i in todo], k=config.top_k_retrieval, search_filter=search_filter)
+            hits = [self._hybrid_candidates(queries[i], docs, batch_trace, search_filter) for i, docs in zip(todo, hits)]
+            # Same cascade as _rerank (without the latency budget), one CrossEncoder request for the chunk
+            plans = [self._cheap_stage(docs) for docs in hits]
+            with batch_trace.stage("batch_rerank"):
+                scores = self._reranker.predict_many([(queries[i], [doc for doc, _ in survivors]) for i, (survivors, _) in zip(todo, plans)])
+            for i, docs, (_, path), rerank_scores in zip(todo, hits, plans, scores):
+                item = items[i]
+                reranked_docs, item["rerank"] = self._rank(docs, list(rerank_scores), path)
+                final_docs_with_scores = reranked_docs[:config.top_k_ranking]
+                if not final_docs_with_scores:
+                    item["result"] = {"answer": "I don't know.", "sources": []}
+                    continue
+                item["future"] = self._batch_llm_executor.submit(self._answer_from_docs, queries[i], final_docs_with_scores, item["trace"])
+                if cache is not None:
+                    item["future"].add_done_callback(
+                        lambda f, q=queries[i], e=embedding_of[i]: f.cancelled() or f.exception() or cache.put(q, e, f.result(), generation)
+                    )
+
+        for item in items:
+            item["batch_stages"] = batch_trace.stages
+        return items
+
+    def _batch_result(self, index: int, query: str, item: dict, include_timings: bool) -> dict:
+        response = {"index": index, "query": query}
+        try:
+            result = item["future"].result() if "future" in item else item["result"]
+        except Exception as e:
+            return {**response, "error": f"Failed to process query: {e}"}
+        QUERIES_TOTAL.inc(path=item["path"])
+        response.update(result)
+        if "rerank" in item:
+            response["rerank"] = item["rerank"]
+        if include_timings:
+            # Shared stages are observed once per chunk but count towards every query's breakdown
+            response["timings"] = {**item["batch_stages"], **item["trace"].stages}
+        return response
+
+    def answer_queries(self, queries: List[str], include_timings: bool = False, search_filter: Optional[MetadataFilter] = None) -> Iterator[dict]:
+        """
+        Answers many queries, yielding {"index", "query", "answer", "sources"} (or "error")
+        in input order. Queries are processed in chunks of query.batch_chunk_size: each chunk
+        is embedded, searched and reranked together, and its LLM calls run on the batch pool
+        (query.batch_llm_concurrency at once) while the next chunk is retrieved. At most two
+        chunks are held in memory regardless of the batch size.
+        """
+        if config.top_k_ranking <= 0:
+            # The vanilla chain has no batched retrieval; answer one at a time
+            for index, query in enumerate(queries):
+                yield {"index": index, "query": query, **self.answer_query(query, include_timings, search_filter=search_filter)}
+            return
+
+        chunk_size = max(1, config.query.batch_chunk_size)
+        pending = deque()  # (index, query, item)
+        try:
+            for start in range(0, len(queries), chunk_size):
+                chunk = queries[start:start + chunk_size]
+                for offset, item in enumerate(self._start_batch(chunk, include_timings, search_filter)):
+                    pending.append((start + offset, chunk[offset], item))
+                while len(pending) > chunk_size:
+                    yield self._batch_result(*pending.popleft(), include_timings)
+            while pending:
+                yield self._batch_result(*pending.popleft(), include_timings)
+        finally:
+            # Drop queued LLM calls if the caller stops consuming (e.g. the client disconnected)
+            for _, _, item in pending:
+                if "future" in item:
+                    item["future"].cancel()
+
+    def reranker_stats(self) -> dict:
+        """Batch fill rate and score cache counters of the reranker."""
+        return self._reranker.stats()
+
+    def llm_stats(self) -> dict:
+        """Generation, coalescing, rejection, timeout and cancellation counters of the LLM client."""
+        return {"provider": self._llm_client.backend.name, **self._llm_client.stats()}
+
+    def session_stats(self) -> dict:
+        """Session count, memory, evictions, expirations, summaries and reused retrievals."""
+        return self._sessions.stats()
+
+    def end_session(self, session_id: str) -> bool:
+        return self._sessions.delete(session_id)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters and size of the query cache."""
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.stats()}
+
+    def check_capacity(self):
+        """Raise QueryOverloadedError if query.max_pending queries are already in flight."""
+        # Only touched from the event loop thread, so no lock is needed
+        if self._pending >= config.query.max_pending:
+            raise QueryOverloadedError(f"Too many pending queries ({self._pending}), try again later.")
+
+    async def aanswer_query(
+        self, query: str, include_timings: bool = False, session_id: Optional[str] = None, search_filter: Optional[MetadataFilter] = None
+    ) -> dict:
+        """
+        Non-blocking answer_query for the API. At most query.max_concurrency queries run
+        at once; beyond query.max_pending queued queries new ones are rejected.
+        """
+        self.check_capacity()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.answer_query, query, include_timings, session_id, search_filter)
+        finally:
+            self._pending -= 1
+
+    def _admit(self, session_id: Optional[str] = None) -> Tuple[Optional[Session], Callable[[], None]]:
+        """
+        Takes a query.max_pending slot, and the session's turn (see SessionStore.begin_turn),
+        for a streamed response. The check and the count happen in one step on the event
+        loop thread, so a burst cannot pass admission before any of it is counted. Returns
+        the session and the release function; calling it again is a no-op.
+        """
+        self.check_capacity()
+        session = self._sessions.begin_turn(session_id) if session_id is not None else None
+        self._pending += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._pending -= 1
+                if session is not None:
+                    self._sessions.end_turn(session)
+        return session, release
+
+    async def _aiterate(self, items: Iterator[dict], cancel: threading.Event, release: Callable[[], None]) -> AsyncIterator[dict]:
+        """
+        Drives a blocking generator from the event loop, one step at a time on the query
+        pool, and calls `release` once it ends. If the consumer goes away (e.g. the client
+        disconnected), `cancel` is set so a step waiting on the LLM returns early, and the
+        generator is closed once no step is running any more: closing a generator that is
+        still executing would raise.
+        """
+        try:
+            step = None
+            try:
+                while True:
+                    step = self._executor.submit(next, items, None)
+                    item = await asyncio.wrap_future(step)
+                    if item is None:
+                        break
+                    yield item
+            finally:
+                cancel.set()
+                if step is None:
+                    items.close()
+                else:
+                    # Runs right away if the step is done, else on its thread when it returns.
+                    # Closing releases the LLM stream / pending batch calls.
+                    step.add_done_callback(lambda _: items.close())
+        finally:
+            release()
+
+    def astream_answer(
+        self, query: str, session_id: Optional[str] = None, search_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[AsyncIterator[dict], Callable[[], None]]:
+        """
+        Non-blocking stream_answer. Raises QueryOverloadedError or SessionBusyError right
+        away, before anything is sent. Returns the stream and its release function, which the
+        caller must also call (e.g. as a response background task) in case the stream is never iterated.
+        """
+        session, release = self._admit(session_id)
+        cancel = threading.Event()
+        return self._aiterate(self._stream_answer(query, session, search_filter, cancel.is_set), cancel, release), release
+
+    def aanswer_queries(
+        self, queries: List[str], include_timings: bool = False, search_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[AsyncIterator[dict], Callable[[], None]]:
+        """
+        Non-blocking answer_queries; a whole batch counts as one pending query. Raises
+        QueryOverloadedError right away, before anything is sent. Returns the results and
+        their release function, like astream_answer.
+        """
+        _, release = self._admit()
+        return self._aiterate(self.answer_queries(queries, include_timings, search_filter), threading.Event(), release), release
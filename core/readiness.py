@@ -0,0 +1,68 @@
+# core/readiness.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+class ComponentTracker:
+    """
+    Load state of the server's heavy components (models, vector store, services) for the
+    readiness probe. Each component is "pending", "loading", "ready", "failed" or "skipped",
+    with the seconds spent per step (e.g. import, load, query).
+    """
+    def __init__(self, *names: str):
+        self._lock = threading.Lock()
+        self._components: Dict[str, dict] = {name: {"state": "pending", "seconds": {}} for name in names}
+
+    def _entry(self, name: str) -> dict:
+        # Caller holds the lock
+        return self._components.setdefault(name, {"state": "pending", "seconds": {}})
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            return self._entry(name)["state"] == "ready"
+
+    @contextmanager
+    def loading(self, name: str):
+        """Marks `name` as loading for the duration of the block, then ready or failed."""
+        with self._lock:
+            self._entry(name).update(state="loading", error=None)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self._entry(name).update(state="failed", error=str(e))
+            print(f"Failed to load {name}: {e}")
+            raise
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            entry = self._entry(name)
+            entry["state"] = "ready"
+            entry["seconds"]["total"] = elapsed
+        print(f"Loaded {name} in {elapsed:.2f}s.")
+
+    @contextmanager
+    def step(self, name: str, step: str):
+        """Times one step of loading `name` (e.g. "import" or "warmup") and logs it."""
+        t0 = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self._entry(name)["seconds"][step] = elapsed
+        print(f"{name}: {step} took {elapsed:.2f}s.")
+
+    def skip(self, name: str):
+        """For components disabled by config; they do not hold up readiness."""
+        with self._lock:
+            self._entry(name)["state"] = "skipped"
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(entry["state"] in ("ready", "skipped") for entry in self._components.values())
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: {**entry, "seconds": dict(entry["seconds"])} for name, entry in self._components.items()}
+
+components = ComponentTracker("embedding_model", "vector_store", "lexical_index", "rag_service", "ingestion_service", "warmup")
@@ -0,0 +1,123 @@
+# core/reranker.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+def chunk_key(doc: Document) -> str:
+    """Stable id for a chunk: its vector store primary key, or a hash of its text."""
+    return doc.metadata.get("pk") or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+class BatchingReranker:
+    """
+    Wraps a CrossEncoder so that concurrent queries share forward passes.
+    Pairs submitted by different threads are merged into one predict() call of up to
+    batch_size pairs; the scheduler waits at most max_wait_ms for a batch to fill.
+    Scores are cached per (query hash, chunk id) so a pair is never scored twice.
+    """
+    def __init__(self, model: "CrossEncoder", batch_size: int, max_wait_ms: float, cache_size: int):
+        self._model = model
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: List[tuple] = []  # (pairs, future)
+        self._queued_pairs = 0
+        self._cond = threading.Condition()
+        self._stats = {"batches": 0, "pairs_scored": 0, "requests": 0, "cache_hits": 0, "cache_misses": 0}
+        threading.Thread(target=self._run, name="reranker-batcher", daemon=True).start()
+
+    def predict(self, query: str, docs: List[Document]) -> np.ndarray:
+        """Return one relevance score per doc (higher is better)."""
+        return self.predict_many([(query, docs)])[0]
+
+    def predict_many(self, requests: List[Tuple[str, List[Document]]]) -> List[np.ndarray]:
+        """
+        Scores several (query, docs) requests at once. All uncached pairs are queued as a
+        single request, so they run as consecutive full batches of batch_size pairs.
+        """
+        keys, scores, missing = [], [], []  # missing: (request index, doc index)
+        with self._cache_lock:
+            for r, (query, docs) in enumerate(requests):
+                query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+                request_keys = [(query_hash, chunk_key(doc)) for doc in docs]
+                request_scores = np.empty(len(docs), dtype=np.float32)
+                for i, key in enumerate(request_keys):
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                        request_scores[i] = self._cache[key]
+                    else:
+                        missing.append((r, i))
+                keys.append(request_keys)
+                scores.append(request_scores)
+            self._stats["cache_hits"] += sum(len(docs) for _, docs in requests) - len(missing)
+            self._stats["cache_misses"] += len(missing)
+
+        if missing:
+            future = Future()
+            with self._cond:
+                self._queue.append(([(requests[r][0], requests[r][1][i].page_content) for r, i in missing], future))
+                self._queued_pairs += len(missing)
+                self._cond.notify()
+            new_scores = future.result()
+            with self._cache_lock:
+                for (r, i), score in zip(missing, new_scores):
+                    scores[r][i] = score
+                    self._cache[keys[r][i]] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def _next_batch(self) -> List[tuple]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while self._queued_pairs < self.batch_size and (remaining := deadline - time.monotonic()) > 0:
+                self._cond.wait(remaining)
+            batch, pairs = [], 0
+            # Take whole requests; a request larger than batch_size goes alone
+            while self._queue and (not batch or pairs + len(self._queue[0][0]) <= self.batch_size):
+                request = self._queue.pop(0)
+                batch.append(request)
+                pairs += len(request[0])
+            self._queued_pairs -= pairs
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+            try:
+                scores = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._stats["batches"] += 1
+            self._stats["pairs_scored"] += len(pairs)
+            self._stats["requests"] += len(batch)
+            offset = 0
+            for request_pairs, future in batch:
+                future.set_result(scores[offset:offset + len(request_pairs)])
+                offset += len(request_pairs)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        batches = stats["batches"]
+        # Fill rate: how full each predict() call was relative to batch_size
+        stats["batch_fill_rate"] = min(1.0, stats["pairs_scored"] / (batches * self.batch_size)) if batches else 0.0
+        stats["requests_per_batch"] = stats["requests"] / batches if batches else 0.0
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        with self._cache_lock:
+            stats["cache_entries"] = len(self._cache)
+        return stats
@@ -0,0 +1,131 @@
+# core/sessions.py
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Optional
+import numpy as np
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep the people, places, dates and facts that later questions may refer to. Write at most {max_words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Updated summary:"""
+
+class SessionBusyError(RuntimeError):
+    """Raised when a session already has a turn in flight; turns of a session run one at a time."""
+
+def format_turns(turns: List[dict]) -> str:
+    return "\n".join(f"User: {turn['query']}\nAssistant: {turn['answer']}" for turn in turns)
+
+class Session:
+    """
+    Conversation state of one session: a running summary of older turns, the most recent
+    turns verbatim, and the chunks (and query embedding) of the last retrieval for reuse.
+    """
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.summary = ""
+        self.turns: List[dict] = []  # {"query", "answer"}, oldest first
+        self.chunks: List[tuple] = []  # (pk, rerank_score, vector_score) of the last answer's context
+        self.embedding: Optional[np.ndarray] = None  # Unit vector of the last retrieval query
+        self.generation: Optional[int] = None  # Vector store generation the chunks came from
+        self.filter_key: Optional[str] = None  # Search filter the chunks were retrieved with
+        self.summarizing: Optional[Future] = None  # Pending fold of old turns into the summary
+        self.turn_count = 0
+        self.touched = time.monotonic()
+        self.size = 0
+        self.in_turn = False  # A turn is being answered; set and cleared by SessionStore
+
+    def estimate_size(self) -> int:
+        text = len(self.summary.encode("utf-8")) + sum(len(t["query"].encode("utf-8")) + len(t["answer"].encode("utf-8")) for t in self.turns)
+        return text + 96 * len(self.chunks) + (self.embedding.nbytes if self.embedding is not None else 0)
+
+class SessionStore:
+    """
+    Bounded in-memory session store. Sessions are evicted least recently used first once
+    max_sessions or max_bytes is exceeded, and expire after ttl_seconds without a turn.
+    """
+    def __init__(self, max_sessions: int, max_bytes: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"created": 0, "evictions": 0, "expirations": 0, "reused_retrievals": 0, "summaries": 0}
+
+    def _expired(self, session: Session) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - session.touched > self.ttl_seconds
+
+    def _pop(self, session_id: str):
+        # Caller holds the lock
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+
+    def begin_turn(self, session_id: str) -> Session:
+        """
+        The session (created if needed) with a turn marked in flight. Raises SessionBusyError
+        if it already has one, so concurrent turns never read the same history or record
+        out of order, and no thread waits on another turn's generation.
+        """
+        with self._lock:
+            session = self._get_or_create(session_id)
+            if session.in_turn:
+                raise SessionBusyError(f"Session '{session_id}' is still answering the previous question, try again once it is done.")
+            session.in_turn = True
+            return session
+
+    def end_turn(self, session: Session):
+        with self._lock:
+            session.in_turn = False
+
+    def _get_or_create(self, session_id: str) -> Session:
+        # Caller holds the lock
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session) and not session.in_turn:
+            self._pop(session_id)
+            self._counters["expirations"] += 1
+            session = None
+        if session is None:
+            session = self._sessions[session_id] = Session(session_id)
+            self._counters["created"] += 1
+        session.touched = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def update(self, session: Session):
+        """Re-accounts a session's memory after a turn and evicts to stay within the caps."""
+        with self._lock:
+            if self._sessions.get(session.id) is not session:
+                return  # Evicted or deleted meanwhile
+            session.touched = time.monotonic()
+            size = session.estimate_size()
+            self._bytes += size - session.size
+            session.size = size
+            for session_id in [k for k, s in self._sessions.items() if self._expired(s)]:
+                self._pop(session_id)
+                self._counters["expirations"] += 1
+            while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+                self._pop(next(iter(self._sessions)))
+                self._counters["evictions"] += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._pop(session_id)
+            return True
+
+    def count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "sessions": len(self._sessions), "bytes": self._bytes}
@@ -0,0 +1,203 @@
+# data_access/bm25_index.py
+import math
+import os
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from core.config import config
+
+_TOKEN_RE = re.compile(r"\w+")
+# Kept short on purpose: names and dates are what the lexical side is for
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have he her his how in is it its "
+    "of on or she that the their they this to was were what when where which who whom why with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def default_index_path() -> Path:
+    """Index lives next to the Milvus db, e.g. persisted_docs.db -> persisted_docs.bm25.npz"""
+    db_path = Path(config.persisted_db_uri)
+    return db_path.with_name(f"{db_path.stem}.bm25.npz")
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over chunk texts, keyed by vector store chunk id.
+    Postings are two parallel array('I') per term (internal doc number, term frequency),
+    appended in doc number order. Deletes only clear the doc's live flag; postings of dead
+    docs are dropped by compact(), which runs automatically once they make up a quarter
+    of the index. Persisted as a single .npz in CSR layout.
+    """
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path) if path else default_index_path()
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._clear()
+        self.exists = self.path.exists()
+        if self.exists:
+            self._load()
+
+    def _clear(self):
+        self._terms: Dict[str, int] = {}
+        self._doc_postings: List[array] = []  # per term id
+        self._tf_postings: List[array] = []
+        self._ids: List[str] = []  # per doc number
+        self._doc_of: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._live = bytearray()
+        self._live_count = 0
+        self._live_length = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index chunks; an id that is already indexed is replaced."""
+        with self._lock:
+            for id_, text in zip(ids, texts):
+                if id_ in self._doc_of:
+                    self._remove(id_)
+                doc = len(self._ids)
+                counts: Dict[str, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    term = self._terms.get(token)
+                    if term is None:
+                        term = self._terms[token] = len(self._doc_postings)
+                        self._doc_postings.append(array("I"))
+                        self._tf_postings.append(array("I"))
+                    self._doc_postings[term].append(doc)
+                    self._tf_postings[term].append(tf)
+                self._ids.append(id_)
+                self._doc_of[id_] = doc
+                self._lengths.append(len(tokens))
+                self._live.append(1)
+                self._live_count += 1
+                self._live_length += len(tokens)
+
+    def _remove(self, id_: str):
+        # Caller holds the lock
+        doc = self._doc_of.pop(id_, None)
+        if doc is not None and self._live[doc]:
+            self._live[doc] = 0
+            self._live_count -= 1
+            self._live_length -= self._lengths[doc]
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for id_ in ids:
+                self._remove(id_)
+            if len(self._ids) - self._live_count > max(1000, len(self._ids) // 4):
+                self._compact()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        """Renumber live docs densely and drop postings of deleted ones. Caller holds the lock."""
+        live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+        new_number = np.cumsum(live, dtype=np.int64) - 1
+        terms, doc_postings, tf_postings = {}, [], []
+        for token, term in self._terms.items():
+            docs = np.frombuffer(self._doc_postings[term], dtype=np.uint32)
+            keep = live[docs]
+            if keep.any():
+                terms[token] = len(doc_postings)
+                doc_postings.append(array("I", new_number[docs[keep]].astype(np.uint32).tobytes()))
+                tf_postings.append(array("I", np.frombuffer(self._tf_postings[term], dtype=np.uint32)[keep].tobytes()))
+        self._terms, self._doc_postings, self._tf_postings = terms, doc_postings, tf_postings
+        self._ids = [id_ for id_, alive in zip(self._ids, live) if alive]
+        self._doc_of = {id_: doc for doc, id_ in enumerate(self._ids)}
+        self._lengths = array("I", np.frombuffer(self._lengths, dtype=np.uint32)[live].tobytes())
+        self._live = bytearray(b"\x01" * len(self._ids))
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (chunk id, BM25 score) for the query, best first."""
+        tokens = set(tokenize(query))
+        with self._lock:
+            if not tokens or not self._live_count:
+                return []
+            live = np.frombuffer(bytes(self._live), dtype=np.uint8)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+            avg_length = self._live_length / self._live_count
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for token in tokens:
+                term = self._terms.get(token)
+                if term is None:
+                    continue
+                docs = np.frombuffer(self._doc_postings[term], dtype=np.uint32)
+                docs_live = live[docs].astype(bool)
+                docs = docs[docs_live]
+                if not len(docs):
+                    continue
+                tfs = np.frombuffer(self._tf_postings[term], dtype=np.uint32)[docs_live].astype(np.float32)
+                idf = math.log(1 + (self._live_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            ids = self._ids
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[doc], float(scores[doc])) for doc in top]
+
+    def save(self):
+        """Compacts and writes the index atomically."""
+        with self._lock:
+            self._compact()
+            tokens = list(self._terms)
+            offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self._doc_postings[self._terms[t]]) for t in tokens])
+            docs = np.concatenate([np.frombuffer(self._doc_postings[self._terms[t]], dtype=np.uint32) for t in tokens]) if tokens else np.zeros(0, np.uint32)
+            tfs = np.concatenate([np.frombuffer(self._tf_postings[self._terms[t]], dtype=np.uint32) for t in tokens]) if tokens else np.zeros(0, np.uint32)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    terms=np.array(tokens, dtype=str),
+                    offsets=offsets,
+                    docs=docs,
+                    tfs=tfs,
+                    ids=np.array(self._ids, dtype=str),
+                    lengths=np.frombuffer(self._lengths, dtype=np.uint32),
+                )
+            os.replace(tmp_path, self.path)
+            self.exists = True
+
+    def _load(self):
+        with np.load(self.path) as data:
+            offsets = data["offsets"]
+            docs, tfs = data["docs"], data["tfs"]
+            for term, token in enumerate(data["terms"].tolist()):
+                self._terms[token] = term
+                self._doc_postings.append(array("I", docs[offsets[term]:offsets[term + 1]].tobytes()))
+                self._tf_postings.append(array("I", tfs[offsets[term]:offsets[term + 1]].tobytes()))
+            self._ids = data["ids"].tolist()
+            self._lengths = array("I", data["lengths"].astype(np.uint32).tobytes())
+        self._doc_of = {id_: doc for doc, id_ in enumerate(self._ids)}
+        self._live = bytearray(b"\x01" * len(self._ids))
+        self._live_count = len(self._ids)
+        self._live_length = int(sum(self._lengths))
+        print(f"Loaded BM25 index with {self._live_count} chunks and {len(self._terms)} terms from {self.path}.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "chunks": self._live_count,
+                "deleted": len(self._ids) - self._live_count,
+                "terms": len(self._terms),
+                "postings": sum(len(p) for p in self._doc_postings),
+            }
@@ -0,0 +1,114 @@
+# data_access/embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.config import config
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_CHUNK = 500
+
+def default_cache_path() -> Path:
+    """Cache lives next to the Milvus db, e.g. persisted_docs.db -> persisted_docs.embeddings.sqlite"""
+    db_path = Path(config.persisted_db_uri)
+    return db_path.with_name(f"{db_path.stem}.embeddings.sqlite")
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a persistent SQLite cache keyed by (model name, sha256 of text).
+    The model name is part of the key, so switching embedding_model never serves vectors
+    produced by another model. The oldest rows are pruned beyond max_entries.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, path: Optional[str] = None, max_entries: int = 1_000_000):
+        self._embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self._conn = sqlite3.connect(str(path or default_cache_path()), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_CHUNK):
+                chunk = hashes[start:start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+                found.update((text_hash, np.frombuffer(vector, dtype=np.float32).tolist()) for text_hash, vector in rows)
+        return found
+
+    def _store(self, hashes: List[str], vectors: List[List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(self.model_name, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in zip(hashes, vectors)],
+            )
+            # Approximate row count (replaced rows are counted twice) to avoid a COUNT(*) per batch
+            self._count += len(hashes)
+            if self._count > self.max_entries:
+                (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if self._count > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                        (self._count - self.max_entries,),
+                    )
+                    self._count = self.max_entries
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(text) for text in texts]
+        found = self._lookup(list(set(hashes)))
+
+        missing = {}  # hash -> text, deduplicated within the batch
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in found:
+                missing.setdefault(text_hash, text)
+        if missing:
+            # Round through float32 so fresh and cached vectors are bit-identical
+            vectors = np.asarray(self._embeddings.embed_documents(list(missing.values())), dtype=np.float32).tolist()
+            self._store(list(missing), vectors)
+            found.update(zip(missing, vectors))
+
+        with self._lock:
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are cached under their own namespace since some models embed queries differently
+        text_hash = "query:" + self._hash(text)
+        found = self._lookup([text_hash])
+        if text_hash in found:
+            with self._lock:
+                self._stats["hits"] += 1
+            return found[text_hash]
+        vector = np.asarray(self._embeddings.embed_query(text), dtype=np.float32).tolist()
+        self._store([text_hash], [vector])
+        with self._lock:
+            self._stats["misses"] += 1
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = self._count
+        return stats
@@ -0,0 +1,78 @@
+# data_access/filters.py
+import json
+import math
+from typing import List, Optional
+
+class FilterError(ValueError):
+    """The filter is invalid, or refers to a field the collection does not have."""
+
+class MetadataFilter:
+    """
+    Restricts a search to chunks whose metadata matches every given condition: `source`
+    is one of `sources`, `page_number` is within [page_min, page_max] and `ingested_at`
+    (unix seconds) within [ingested_after, ingested_before]; bounds are inclusive.
+    Backend-neutral: vector stores translate it into their own filter (Milvus: a
+    boolean scalar expression), and in-process indexes use matches().
+    """
+    def __init__(
+        self,
+        sources: Optional[List[str]] = None,
+        page_min: Optional[int] = None,
+        page_max: Optional[int] = None,
+        ingested_after: Optional[float] = None,
+        ingested_before: Optional[float] = None,
+    ):
+        if sources is not None and not sources:
+            raise FilterError("sources must not be empty.")
+        if page_min is not None and page_max is not None and page_min > page_max:
+            raise FilterError("page_min is greater than page_max.")
+        if ingested_after is not None and ingested_before is not None and ingested_after > ingested_before:
+            raise FilterError("ingested_after is later than ingested_before.")
+        self.sources = sorted(set(sources)) if sources else None
+        self.page_min = page_min
+        self.page_max = page_max
+        # ingested_at is stored in whole seconds
+        self.ingested_after = math.ceil(ingested_after) if ingested_after is not None else None
+        self.ingested_before = math.floor(ingested_before) if ingested_before is not None else None
+
+    def _ranges(self):
+        """(metadata field, lower bound, upper bound) for each range condition."""
+        return [
+            ("page_number", self.page_min, self.page_max),
+            ("ingested_at", self.ingested_after, self.ingested_before),
+        ]
+
+    @property
+    def fields(self) -> List[str]:
+        """Metadata fields the filter refers to."""
+        fields = ["source"] if self.sources else []
+        return fields + [field for field, low, high in self._ranges() if low is not None or high is not None]
+
+    @property
+    def key(self) -> str:
+        """Identifies the filter, e.g. to tell whether two searches had the same scope."""
+        return json.dumps([self.sources, self.page_min, self.page_max, self.ingested_after, self.ingested_before])
+
+    def matches(self, metadata: dict) -> bool:
+        if self.sources and metadata.get("source") not in self.sources:
+            return False
+        for field, low, high in self._ranges():
+            if low is None and high is None:
+                continue
+            value = metadata.get(field)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def to_milvus_expr(self) -> str:
+        """Milvus boolean expression, evaluated (with scalar indexes) before the vector search."""
+        conditions = []
+        if self.sources:
+            # JSON string literals are valid Milvus string literals, quotes and backslashes escaped
+            conditions.append(f"source in [{', '.join(json.dumps(source) for source in self.sources)}]")
+        for field, low, high in self._ranges():
+            if low is not None:
+                conditions.append(f"{field} >= {low}")
+            if high is not None:
+                conditions.append(f"{field} <= {high}")
+        return " and ".join(conditions)
@@ -0,0 +1,339 @@
+# data_access/numpy_vector_store.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from core.config import config
+from data_access.filters import MetadataFilter
+from data_access.vector_store import VectorStore
+
+MIN_CAPACITY = 1024 # Rows the vector file is first sized for; it doubles when full
+
+def default_store_path() -> Path:
+    """Store lives next to the Milvus db, e.g. persisted_docs.db -> persisted_docs.vectors/"""
+    db_path = Path(config.persisted_db_uri)
+    return db_path.with_name(f"{db_path.stem}.vectors")
+
+class _Retriever(BaseRetriever):
+    """LangChain retriever over a VectorStore, for the vanilla RetrievalQA chain."""
+    store: Any
+    k: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.store.similarity_search_with_score(query, self.k)]
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact-search vector store for small and medium corpora (and tests), with
+    no server, startup cost or lock file. Unit-normalized embeddings are stored as rows of
+    a memory-mapped float32 or float16 file (`vectors.bin`) that is appended to in place
+    and doubles in size when full. Chunk ids, texts and metadata go to an append-only
+    sidecar (`meta.jsonl`) of insert and delete records, replayed on open. A search scores
+    every live row with one matrix product per block of rows for all queries at once.
+    Deletes only clear a row's live flag; flush() compacts the files once dead rows make
+    up a quarter of them. Scores follow similarity_metric like Milvus: squared L2
+    distance for L2 (lower is better), cosine similarity for IP and COSINE.
+    """
+    def __init__(self, embedding_fn: Embeddings, path: Optional[str] = None):
+        self._embedding_fn = embedding_fn
+        numpy_config = config.vector_store.numpy
+        self.path = Path(path or numpy_config.path or default_store_path())
+        self.dtype = np.dtype(numpy_config.dtype)
+        self._block_rows = numpy_config.search_block_rows
+        self._lock = threading.Lock()
+        self._insert_stats = {"chunks": 0, "embed_seconds": 0.0, "insert_seconds": 0.0}
+        self._open()
+
+    def _clear(self):
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._rows = 0  # Rows written, live or not
+        self._live = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._ids: List[str] = []  # per row
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._row_of = {}
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.bin"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.path / "meta.jsonl"
+
+    def _open(self):
+        """Maps the vector file and replays the sidecar."""
+        self._clear()
+        self.path.mkdir(parents=True, exist_ok=True)
+        header_path = self.path / "store.json"
+        if header_path.exists():
+            with open(header_path) as f:
+                header = json.load(f)
+            if np.dtype(header["dtype"]) != self.dtype:
+                print(f"Vector store at {self.path} holds {header['dtype']} vectors, ignoring vector_store.numpy.dtype={self.dtype}.")
+                self.dtype = np.dtype(header["dtype"])
+            self._dim = header["dim"]
+        if self._meta_path.exists():
+            with open(self._meta_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    if "deleted" in record:
+                        for id_ in record["deleted"]:
+                            self._kill(self._row_of.pop(id_, None))
+                    else:
+                        self._append_row(record["id"], record["text"], record["metadata"])
+        if self._dim is not None and self._vectors_path.exists():
+            capacity = self._vectors_path.stat().st_size // (self._dim * self.dtype.itemsize)
+            # Rows whose vectors never reached the file (a crash mid-write) are dropped
+            for row in range(capacity, self._rows):
+                if self._row_of.get(self._ids[row]) == row:
+                    del self._row_of[self._ids[row]]
+                self._kill(row)
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self._dim))
+        self._meta_file = open(self._meta_path, "a", encoding="utf-8")
+        if self._rows:
+            print(f"Opened vector store at {self.path}: {self._live_count} chunks.")
+
+    def _append_row(self, id_: str, text: str, metadata: dict):
+        # Caller holds the lock (or is _open); an id that is already stored is replaced
+        self._kill(self._row_of.get(id_))
+        if self._rows == len(self._live):
+            self._live = np.concatenate([self._live, np.zeros(max(MIN_CAPACITY, self._rows), dtype=bool)])
+        self._live[self._rows] = True
+        self._live_count += 1
+        self._row_of[id_] = self._rows
+        self._ids.append(id_)
+        self._texts.append(text)
+        self._metadatas.append(metadata)
+        self._rows += 1
+
+    def _kill(self, row: Optional[int]):
+        if row is not None and self._live[row]:
+            self._live[row] = False
+            self._live_count -= 1
+
+    def _ensure_capacity(self, rows: int):
+        """Grows the vector file (doubling) and remaps it. Caller holds the lock."""
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if rows <= capacity:
+            return
+        capacity = max(MIN_CAPACITY, capacity)
+        while capacity < rows:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self._dim * self.dtype.itemsize)
+        # Searches still holding the old map keep reading the rows it covers
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self._dim))
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @property
+    def embedding_fn(self) -> Embeddings:
+        return self._embedding_fn
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        """Embeds and appends documents in batches of ingestion.batch_size."""
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+        print(f"Adding {len(documents)} document chunks to the vector store.")
+        batch_size = config.ingestion.batch_size
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            t0 = time.perf_counter()
+            embeddings = self._embedding_fn.embed_documents([doc.page_content for doc in batch])
+            self._insert_stats["embed_seconds"] += time.perf_counter() - t0
+            self.add_embeddings(batch, embeddings, ids[start:start + batch_size])
+
+    def add_embeddings(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]):
+        """Appends pre-embedded documents: vectors into the mapped file, records to the sidecar."""
+        if not documents:
+            return
+        t0 = time.perf_counter()
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                with open(self.path / "store.json", "w") as f:
+                    json.dump({"dim": self._dim, "dtype": self.dtype.name}, f)
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store's {self._dim}; reset it first.")
+            start = self._rows
+            self._ensure_capacity(start + len(documents))
+            # Vectors first, so a replayed sidecar record always has its row
+            self._vectors[start:start + len(documents)] = vectors.astype(self.dtype)
+            for doc, id_ in zip(documents, ids):
+                metadata = {key: value for key, value in doc.metadata.items() if key != "pk"}
+                self._meta_file.write(json.dumps({"id": id_, "text": doc.page_content, "metadata": metadata}) + "\n")
+                self._append_row(id_, doc.page_content, metadata)
+        self._insert_stats["insert_seconds"] += time.perf_counter() - t0
+        self._insert_stats["chunks"] += len(documents)
+        self._bump_generation()
+
+    @staticmethod
+    def _document(ids: List[str], texts: List[str], metadatas: List[dict], row: int) -> Document:
+        return Document(page_content=texts[row], metadata={**metadatas[row], "pk": ids[row]})
+
+    def similarity_search_batch(
+        self, embeddings: List[List[float]], k: int, search_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Exact top-k for all query embeddings: the live (and filter-matching) rows are
+        scored block by block against every query with one matrix product, and only a
+        running top-k per query is kept, so memory stays bounded by
+        vector_store.numpy.search_block_rows rather than the collection size.
+        """
+        with self._lock:
+            # Appends only add rows past `rows` and compaction swaps in new objects, so this stays consistent
+            vectors, rows, live = self._vectors, self._rows, self._live[:self._rows].copy()
+            ids, texts, metadatas = self._ids, self._texts, self._metadatas
+        if vectors is None or not rows or not embeddings:
+            return [[] for _ in embeddings]
+        if search_filter is not None:
+            live &= np.fromiter((search_filter.matches(metadatas[row]) for row in range(rows)), dtype=bool, count=rows)
+        k = min(k, int(live.sum()))
+        if k == 0:
+            return [[] for _ in embeddings]
+
+        queries = self._normalize(embeddings).T  # dim x queries
+        columns = np.arange(queries.shape[1])
+        best_rows = np.empty((0, queries.shape[1]), dtype=np.int64)  # candidates x queries
+        best_sims = np.empty((0, queries.shape[1]), dtype=np.float32)
+        for start in range(0, rows, self._block_rows):
+            end = min(start + self._block_rows, rows)
+            block_live = live[start:end]
+            if not block_live.any():
+                continue
+            block = (vectors[start:end] @ queries).astype(np.float32, copy=False)
+            block[~block_live] = -np.inf
+            block_k = min(k, end - start)
+            top = np.argpartition(-block, block_k - 1, axis=0)[:block_k]
+            # Merge the block's top-k with the running top-k and keep the best k of both
+            sims = np.concatenate([best_sims, block[top, columns]])
+            candidates = np.concatenate([best_rows, top + start])
+            if len(sims) > k:
+                keep = np.argpartition(-sims, k - 1, axis=0)[:k]
+                sims, candidates = sims[keep, columns], candidates[keep, columns]
+            best_sims, best_rows = sims, candidates
+
+        order = np.argsort(-best_sims, axis=0, kind="stable")
+        best_sims, best_rows = best_sims[order, columns], best_rows[order, columns]
+        return [
+            [(self._document(ids, texts, metadatas, int(row)), self._score(float(sim)))
+             for row, sim in zip(best_rows[:, query], best_sims[:, query]) if sim != -np.inf]
+            for query in columns
+        ]
+
+    @staticmethod
+    def _score(similarity: float) -> float:
+        # Squared L2 distance between unit vectors, like Milvus reports for L2
+        return 2.0 - 2.0 * similarity if config.similarity_metric == "L2" else similarity
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """Stored chunks for the given ids, in the order of `ids`; unknown ids are skipped."""
+        with self._lock:
+            rows = [self._row_of.get(id_) for id_ in ids]
+            return [self._document(self._ids, self._texts, self._metadatas, row) for row in rows if row is not None]
+
+    def count(self) -> int:
+        return self._live_count
+
+    def flush(self) -> dict:
+        """Persists the vectors and sidecar written in this run, compacting when a quarter is dead."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._meta_file.flush()
+            os.fsync(self._meta_file.fileno())
+            dead = self._rows - self._live_count
+        if dead and dead * 4 >= self._rows:
+            self.compact()
+        stats = dict(self._insert_stats)
+        elapsed = stats["embed_seconds"] + stats["insert_seconds"]
+        stats["chunks_per_second"] = stats["chunks"] / elapsed if elapsed > 0 else 0.0
+        self._insert_stats = {"chunks": 0, "embed_seconds": 0.0, "insert_seconds": 0.0}
+        print(f"Ingestion to the vector store completed: {stats['chunks']} chunks at {stats['chunks_per_second']:.1f} chunks/s.")
+        return stats
+
+    def delete(self, ids: List[str]):
+        """Marks chunks deleted; their rows are reclaimed by compact()."""
+        if not ids:
+            return
+        print(f"Deleting {len(ids)} document chunks from the vector store.")
+        with self._lock:
+            self._meta_file.write(json.dumps({"deleted": ids}) + "\n")
+            for id_ in ids:
+                self._kill(self._row_of.pop(id_, None))
+        self._bump_generation()
+
+    def reset(self):
+        """Deletes the store's files and starts empty."""
+        with self._lock:
+            self._meta_file.close()
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._open()
+        self._bump_generation()
+
+    def compact(self) -> dict:
+        """Rewrites the vector file and sidecar with live rows only."""
+        start = time.perf_counter()
+        with self._lock:
+            dead = self._rows - self._live_count
+            if not dead:
+                return {"compacted": False, "detail": "No deleted rows."}
+            rows = np.flatnonzero(self._live[:self._rows])
+            capacity = max(MIN_CAPACITY, len(rows))
+            tmp_vectors = self._vectors_path.with_suffix(".bin.tmp")
+            compacted = np.memmap(tmp_vectors, dtype=self.dtype, mode="w+", shape=(capacity, self._dim))
+            compacted[:len(rows)] = self._vectors[rows]
+            compacted.flush()
+            del compacted
+            tmp_meta = self._meta_path.with_suffix(".jsonl.tmp")
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row]}) + "\n")
+            self._meta_file.close()
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_meta, self._meta_path)
+            self._open()
+        seconds = time.perf_counter() - start
+        print(f"Compacted the vector store: dropped {dead} deleted rows in {seconds:.2f}s.")
+        return {"compacted": True, "dropped_rows": dead, "seconds": round(seconds, 3)}
+
+    def rebuild_index(self) -> dict:
+        return {"rebuilt": False, "detail": "Exact search has no index to rebuild."}
+
+    def index_stats(self) -> dict:
+        with self._lock:
+            capacity = len(self._vectors) if self._vectors is not None else 0
+            return {
+                "backend": "numpy",
+                "index_type": "FLAT", # Exact search
+                "metric_type": config.similarity_metric,
+                "dtype": self.dtype.name,
+                "dim": self._dim,
+                "rows": self._live_count,
+                "deleted_rows": self._rows - self._live_count,
+                "capacity_rows": capacity,
+                "bytes": capacity * (self._dim or 0) * self.dtype.itemsize,
+                "segments": 1 if self._rows else 0,
+            }
+
+    def as_retriever(self):
+        return _Retriever(store=self, k=config.top_k_retrieval)
@@ -1,16 +1,119 @@
 # data_access/vector_store.py
+import importlib
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import List
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from langchain_core.vectorstores import VectorStore as LangChainVectorStore
-from langchain_milvus import Milvus
 from core.config import config
+from data_access.filters import FilterError, MetadataFilter
+
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+
+def ann_build_params(index_type: str) -> dict:
+    """Build parameters for a vector index type, from vector_store.index."""
+    index = config.vector_store.index
+    if index_type == "HNSW":
+        return {"M": index.hnsw_m, "efConstruction": index.hnsw_ef_construction}
+    if index_type.startswith("IVF"):
+        return {"nlist": index.ivf_nlist}
+    return {}
+
+def ann_search_params(index_type: str, k: int) -> dict:
+    """Search parameters for a vector index type returning k hits, from vector_store.index."""
+    index = config.vector_store.index
+    if index_type == "HNSW":
+        return {"ef": max(index.search_ef, k)}
+    if index_type.startswith("IVF"):
+        return {"nprobe": min(index.ivf_nprobe, index.ivf_nlist)}
+    return {}
+
+def _unimplemented(error: Exception) -> bool:
+    """Whether a Milvus call failed because the deployment does not offer it (e.g. Milvus Lite)."""
+    code = getattr(error, "code", None)
+    return callable(code) and getattr(code(), "name", None) == "UNIMPLEMENTED"
 
 class VectorStore(ABC):
     """Abstract base class for a vector store."""
+    _generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Incremented whenever stored documents change, so caches can detect stale results."""
+        return self._generation
+
+    def _bump_generation(self):
+        self._generation += 1
+
+    @abstractmethod
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_embeddings(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]):
+        """Insert documents whose embeddings were computed by the caller."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def embedding_fn(self) -> Embeddings:
+        raise NotImplementedError
+
+    @abstractmethod
+    def similarity_search_batch(
+        self, embeddings: List[List[float]], k: int, search_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Top-k (document, score) lists for several query embeddings, in input order.
+        With a `search_filter` only matching chunks are searched.
+        """
+        raise NotImplementedError
+
+    def similarity_search_with_score(
+        self, query: str, k: int, search_filter: Optional[MetadataFilter] = None
+    ) -> List[Tuple[Document, float]]:
+        """Top-k (document, score) pairs for a query text."""
+        return self.similarity_search_batch([self.embedding_fn.embed_query(query)], k, search_filter)[0]
+
+    @abstractmethod
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """Stored documents for the given chunk ids; unknown ids are skipped."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored documents."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush(self) -> dict:
+        """Finish an ingestion run (persist / index) and return its insert stats."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
     @abstractmethod
-    def add_documents(self, documents: List[Document]):
+    def reset(self):
+        """Drop every stored document."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def rebuild_index(self) -> dict:
+        """Rebuild the vector index with the configured parameters."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def compact(self) -> dict:
+        """Reclaim the space of deleted documents."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def index_stats(self) -> dict:
+        """Index type and parameters, row count and storage layout."""
         raise NotImplementedError
 
     @abstractmethod
@@ -21,19 +124,30 @@ class MilvusVectorStore(VectorStore):
     """Milvus implementation of the VectorStore interface."""
     def __init__(self, embedding_fn: Embeddings):
         self._embedding_fn = embedding_fn
+        self._batch_size = config.ingestion.batch_size
+        self._reset_insert_stats()
+        self._segments_supported = True
         # Initialize or connect to the vector store on creation
         # This is a simplified approach. In prod, connection management is key.
-        self._client: LangChainVectorStore = self._get_or_create_store()
+        self._client: "LangChainVectorStore" = self._get_or_create_store()
 
-    def _get_or_create_store(self) -> LangChainVectorStore:
-        # A simple way to check if a collection exists would be needed here.
-        # For this example, we assume we can connect if the URI is valid.
+    def _get_or_create_store(self) -> "LangChainVectorStore":
+        # The same client is reused for every insert. If the collection does not exist
+        # yet, it is created (with the configured index) by the first add_documents call.
+        from langchain_milvus import Milvus  # pymilvus is slow to import, so only when the store is created
         try:
-            # Connect to an existing Milvus store
             store = Milvus(
                 embedding_function=self._embedding_fn,
                 connection_args={"uri": config.persisted_db_uri},
-                collection_name="rag_documents" # Use a consistent collection name
+                collection_name="rag_documents", # Use a consistent collection name
+                index_params=self._index_params(),
+                # Used by LangChain's own search paths (the vanilla retriever)
+                search_params={
+                    "metric_type": config.similarity_metric,
+                    "params": ann_search_params(config.retrieval_algorithm, config.top_k_retrieval),
+                },
+                auto_id=False,
+                partition_key_field=config.vector_store.partition_key_field,
             )
         except Exception:
             # This is a simplification. A real check for collection existence is better.
@@ -42,21 +156,245 @@ class MilvusVectorStore(VectorStore):
              store = None
         return store
 
+    @staticmethod
+    def _index_params() -> dict:
+        return {
+            "metric_type": config.similarity_metric,
+            "index_type": config.retrieval_algorithm,
+            "params": ann_build_params(config.retrieval_algorithm),
+        }
+
+    def _reset_insert_stats(self):
+        self._insert_stats = {"chunks": 0, "embed_seconds": 0.0, "insert_seconds": 0.0}
+
+    @property
+    def embedding_fn(self) -> Embeddings:
+        return self._embedding_fn
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        """
+        Appends documents to the open collection, embedding and inserting them in
+        batches of `ingestion.batch_size`. Call flush() once at the end of an ingestion run.
+        """
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
 
-    def add_documents(self, documents: List[Document]):
-        """Adds documents to Milvus, creating the store if it's the first time."""
         print(f"Adding {len(documents)} document chunks to Milvus.")
-        self._client = Milvus.from_documents(
-            documents=documents,
-            embedding=self._embedding_fn,
-            connection_args={"uri": config.persisted_db_uri},
-            collection_name="rag_documents",
-            index_params={
-                "metric_type": config.similarity_metric,
-                "index_type": config.retrieval_algorithm,
-            }
+        for start in range(0, len(documents), self._batch_size):
+            batch = documents[start:start + self._batch_size]
+
+            t0 = time.perf_counter()
+            embeddings = self._embedding_fn.embed_documents([doc.page_content for doc in batch])
+            self._insert_stats["embed_seconds"] += time.perf_counter() - t0
+            self.add_embeddings(batch, embeddings, ids[start:start + self._batch_size])
+
+    def add_embeddings(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]):
+        """Appends pre-embedded documents to the open collection."""
+        if self._client is None:
+            self._client = self._get_or_create_store()
+
+        t0 = time.perf_counter()
+        self._client.add_embeddings(
+            texts=[doc.page_content for doc in documents],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+            batch_size=self._batch_size,
         )
-        print("Ingestion to Milvus completed.")
+        self._insert_stats["insert_seconds"] += time.perf_counter() - t0
+        self._insert_stats["chunks"] += len(documents)
+        self._bump_generation()
+
+    def _filter_expr(self, search_filter: Optional[MetadataFilter]) -> str:
+        """The filter as a Milvus expression ("" for none), checked against the collection's fields."""
+        if search_filter is None:
+            return ""
+        store = self._client
+        missing = [field for field in search_filter.fields if field not in store.fields]
+        if missing and not store.enable_dynamic_field:
+            raise FilterError(f"The collection has no {', '.join(missing)} field; re-ingest the documents to filter on it.")
+        return search_filter.to_milvus_expr()
+
+    def similarity_search_batch(
+        self, embeddings: List[List[float]], k: int, search_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Searches all embeddings in a single multi-vector Milvus request instead of one
+        round trip per query. langchain_milvus only searches one vector at a time, so this
+        issues the search on its MilvusClient with the same params and result parsing.
+        The filter is pushed down as a scalar expression, so Milvus only scores vectors
+        of matching rows.
+        """
+        if self._client is None or self._client.col is None or not embeddings:
+            return [[] for _ in embeddings]
+        store = self._client
+        results = store.client.search(
+            store.collection_name,
+            data=embeddings,
+            filter=self._filter_expr(search_filter),
+            anns_field=store._vector_field,
+            search_params={"metric_type": config.similarity_metric, "params": ann_search_params(config.retrieval_algorithm, k)},
+            limit=k,
+            output_fields=["*"] if store.enable_dynamic_field else store._remove_forbidden_fields(store.fields[:]),
+        )
+        return [store._parse_documents_from_search_results([hits]) for hits in results]
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """Fetches chunks by primary key, in the order of `ids`. Used for lexical-only hits."""
+        if self._client is None or self._client.col is None or not ids:
+            return []
+        store = self._client
+        rows = store.client.get(
+            store.collection_name,
+            ids=ids,
+            output_fields=["*"] if store.enable_dynamic_field else store._remove_forbidden_fields(store.fields[:]),
+        )
+        docs = {row[store._primary_field]: store._parse_document(row) for row in rows}
+        return [docs[id_] for id_ in ids if id_ in docs]
+
+    def count(self) -> int:
+        if self._client is None or self._client.col is None:
+            return 0
+        return self._client.client.get_collection_stats(self._client.collection_name)["row_count"]
+
+    def flush(self) -> dict:
+        """
+        Seals the segments written during this run so Milvus builds/refreshes the index
+        once, and returns the insert throughput of the run.
+        """
+        if self._client is not None and self._client.col is not None:
+            self._client.col.flush()
+            self._ensure_scalar_indexes()
+        stats = self.insert_stats()
+        self._reset_insert_stats()
+        print(f"Ingestion to Milvus completed: {stats['chunks']} chunks at {stats['chunks_per_second']:.1f} chunks/s.")
+        return stats
+
+    def _ensure_scalar_indexes(self):
+        """
+        Indexes the vector_store.scalar_index_fields the collection has, once, so filter
+        expressions on them are resolved from the index instead of scanning every row.
+        """
+        store = self._client
+        for field in config.vector_store.scalar_index_fields:
+            index_name = f"{field}_idx"
+            if field not in store.fields or store.col.has_index(index_name=index_name):
+                continue
+            try:
+                store.col.create_index(field, index_params={"index_type": config.vector_store.scalar_index_type}, index_name=index_name)
+                print(f"Created {config.vector_store.scalar_index_type} index on {field}.")
+            except Exception as e:
+                # Filtering still works without it, just by scanning
+                print(f"Could not index {field}: {e}")
+
+    def insert_stats(self) -> dict:
+        """Chunks written since the last flush and their end-to-end (embed + insert) throughput."""
+        stats = dict(self._insert_stats)
+        elapsed = stats["embed_seconds"] + stats["insert_seconds"]
+        stats["chunks_per_second"] = stats["chunks"] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def delete(self, ids: List[str]):
+        """Deletes chunks by primary key."""
+        if not self._client or not ids:
+            return
+        print(f"Deleting {len(ids)} document chunks from Milvus.")
+        self._client.delete(ids=ids)
+        self._bump_generation()
+
+    def reset(self):
+        """Drops the collection; the next add_documents call recreates it."""
+        if self._client:
+            self._client.drop()
+        self._bump_generation()
+
+    def _vector_index(self):
+        """The collection's vector index, or None."""
+        store = self._client
+        return next((index for index in store.col.indexes if index.field_name == store._vector_field), None)
+
+    def rebuild_index(self) -> dict:
+        """
+        Drops the vector index and builds it again with the current retrieval_algorithm and
+        vector_store.index parameters, e.g. after heavy ingestion or to trade recall against
+        latency. The collection is released while the index builds, so searches fail until
+        it is loaded again.
+        """
+        if self._client is None or self._client.col is None:
+            return {"rebuilt": False, "detail": "The collection does not exist yet."}
+        store = self._client
+        start = time.perf_counter()
+        store.col.flush()
+        store.col.release()
+        try:
+            index = self._vector_index()
+            if index is not None:
+                store.col.drop_index(index_name=index.index_name)
+            index_params = self._index_params()
+            store.col.create_index(store._vector_field, index_params=index_params)
+            store.index_params = index_params
+        finally:
+            store.col.load()
+        self._bump_generation()  # Cached answers came from the old index
+        seconds = time.perf_counter() - start
+        print(f"Rebuilt the {config.retrieval_algorithm} index of {store.collection_name} in {seconds:.2f}s.")
+        return {"rebuilt": True, "seconds": round(seconds, 3)}
+
+    def compact(self) -> dict:
+        """
+        Merges small segments and purges deleted rows, waiting for Milvus to finish.
+        Milvus Lite does not compact; that is reported rather than raised.
+        """
+        if self._client is None or self._client.col is None:
+            return {"compacted": False, "detail": "The collection does not exist yet."}
+        start = time.perf_counter()
+        try:
+            self._client.col.compact()
+        except Exception as e:
+            if _unimplemented(e):
+                return {"compacted": False, "detail": "Compaction is not supported by this Milvus deployment."}
+            raise
+        self._client.col.wait_for_compaction_completed()
+        seconds = time.perf_counter() - start
+        print(f"Compacted {self._client.collection_name} in {seconds:.2f}s.")
+        return {"compacted": True, "seconds": round(seconds, 3)}
+
+    def _segment_count(self) -> Optional[int]:
+        """Loaded segments, or None when the deployment does not report them."""
+        if not self._segments_supported:
+            return None
+        from pymilvus import utility
+        try:
+            return len(utility.get_query_segment_info(self._client.collection_name, using=self._client.alias))
+        except Exception as e:
+            if _unimplemented(e):
+                self._segments_supported = False  # Do not ask again (and log an error) on every call
+                return None
+            raise
+
+    def index_stats(self) -> dict:
+        """Configured and built vector index, row count and loaded segment count."""
+        stats = {
+            "backend": "milvus",
+            "index_type": config.retrieval_algorithm,
+            "metric_type": config.similarity_metric,
+            "build_params": ann_build_params(config.retrieval_algorithm),
+            "search_params": ann_search_params(config.retrieval_algorithm, config.top_k_retrieval),
+            "rows": 0,
+            "segments": None,
+        }
+        if self._client is None or self._client.col is None:
+            return stats
+        store = self._client
+        stats["rows"] = self.count()
+        stats["segments"] = self._segment_count()
+        index = self._vector_index()
+        if index is not None:
+            built = store.client.describe_index(store.collection_name, index.index_name)
+            stats["built_index"] = {
+                key: value for key, value in built.items() if key not in ("field_name", "index_name", "dim")
+            }
+        return stats
 
     def as_retriever(self):
         if not self._client:
@@ -64,4 +402,16 @@ class MilvusVectorStore(VectorStore):
         return self._client.as_retriever(
             search_type="similarity",
             search_kwargs={"k": config.top_k_retrieval}
-        )
\ No newline at end of file
+        )
+
+VECTOR_STORES = {
+    "milvus": "data_access.vector_store.MilvusVectorStore",
+    "numpy": "data_access.numpy_vector_store.NumpyVectorStore",
+}
+
+def create_vector_store(embedding_fn: Embeddings) -> VectorStore:
+    """The vector store selected by vector_db; only the selected backend is imported."""
+    if config.vector_db not in VECTOR_STORES:
+        raise ValueError(f"Unknown vector_db '{config.vector_db}', expected one of {list(VECTOR_STORES)}.")
+    module_name, class_name = VECTOR_STORES[config.vector_db].rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)(embedding_fn)
@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+# The packages are imported by their top-level names and core.config reads ./config.json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from core.config import config
+
+@pytest.fixture
+def store_config(tmp_path, monkeypatch):
+    """Points the persisted db, manifest and in-process vector store at a temporary directory."""
+    monkeypatch.setattr(config, "persisted_db_uri", str(tmp_path / "docs.db"))
+    monkeypatch.setattr(config, "vector_db", "numpy")
+    monkeypatch.setattr(config.vector_store.numpy, "path", None)
+    return config
@@ -0,0 +1,51 @@
+# tests/test_context.py
+from langchain_core.documents import Document
+from core.context import MIN_SEGMENT_TOKENS, TokenCounter, pack_context, truncate_tokens
+
+COUNTER = TokenCounter()  # ~4 characters per token, no model download
+
+def ranked(*chunks):
+    """(rerank_score, (doc, vector_score)) pairs as the reranker returns them."""
+    return [
+        (score, (Document(page_content=text, metadata={"source": source, "page_number": page}), 0.0))
+        for score, text, source, page in chunks
+    ]
+
+def words(start, end):
+    return " ".join(f"word{i}" for i in range(start, end))
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    first, second = words(0, 30), words(20, 50)  # The splitter's chunk_overlap repeats word20..word29
+    context, report = pack_context(ranked((0.9, first, "a.pdf", 1), (0.5, second, "a.pdf", 1)), 1000, COUNTER)
+    assert context == words(0, 50)
+    assert report["chunks"] == 2 and report["segments"] == 1
+
+def test_duplicates_merge_but_other_pages_do_not():
+    text = words(0, 30)
+    context, report = pack_context(
+        ranked((0.2, text, "a.pdf", 1), (0.9, text, "a.pdf", 1), (0.5, text, "a.pdf", 2)), 1000, COUNTER
+    )
+    assert report["segments"] == 2
+    assert context == f"{text}\n\n{text}"
+
+def test_segments_are_packed_best_first_within_the_budget():
+    best, middle, worst = words(0, 40), words(100, 140), words(200, 210)
+    chunks = ranked((0.1, worst, "c.txt", None), (0.9, best, "a.txt", None), (0.5, middle, "b.txt", None))
+    budget = COUNTER.count(best) + COUNTER.count("\n\n") + COUNTER.count(worst) + 5
+    context, report = pack_context(chunks, budget, COUNTER)
+
+    # The middle segment does not fit and leaves too little room to truncate, the short last one still fits
+    assert context == f"{best}\n\n{worst}"
+    assert report["packed_segments"] == 2 and report["truncated_segments"] == 0
+    assert report["context_tokens"] <= budget
+
+def test_segment_that_does_not_fit_is_truncated():
+    long_text = words(0, 400)
+    context, report = pack_context(ranked((0.9, long_text, "a.txt", None)), MIN_SEGMENT_TOKENS * 2, COUNTER)
+    assert report["truncated_segments"] == 1
+    assert report["context_tokens"] <= MIN_SEGMENT_TOKENS * 2
+    assert long_text.startswith(context) and not context.endswith(" ")
+
+def test_truncate_tokens():
+    assert truncate_tokens("short text", 100, COUNTER) == "short text"
+    assert COUNTER.count(truncate_tokens(words(0, 100), 10, COUNTER)) <= 10
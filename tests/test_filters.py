@@ -0,0 +1,38 @@
+# tests/test_filters.py
+import json
+import pytest
+from data_access.filters import FilterError, MetadataFilter
+
+def test_source_literals_are_escaped():
+    sources = ['say "hi".pdf', "back\\slash.txt", "it's.txt", 'x"] or source != "']
+    expr = MetadataFilter(sources=sources).to_milvus_expr()
+    literals = expr[len("source in ["):-1]
+    # Every source is one quoted literal; quotes and backslashes cannot end it early
+    assert json.loads(f"[{literals}]") == sorted(sources)
+    assert expr.startswith("source in [") and expr.endswith("]")
+
+def test_ranges_become_inclusive_bounds():
+    expr = MetadataFilter(page_min=2, page_max=5, ingested_after=10.2, ingested_before=20.8).to_milvus_expr()
+    assert expr == "page_number >= 2 and page_number <= 5 and ingested_at >= 11 and ingested_at <= 20"
+    assert MetadataFilter().to_milvus_expr() == ""
+
+def test_matches_agrees_with_the_expression():
+    search_filter = MetadataFilter(sources=["a.pdf", "b.pdf"], page_min=2, page_max=3)
+    assert search_filter.fields == ["source", "page_number"]
+    assert search_filter.matches({"source": "a.pdf", "page_number": 3})
+    assert not search_filter.matches({"source": "a.pdf", "page_number": 4})
+    assert not search_filter.matches({"source": "c.pdf", "page_number": 2})
+    assert not search_filter.matches({"source": "b.pdf"})
+
+def test_key_identifies_the_scope():
+    assert MetadataFilter(sources=["b", "a", "a"]).key == MetadataFilter(sources=["a", "b"]).key
+    assert MetadataFilter(sources=["a"]).key != MetadataFilter(sources=["a"], page_min=1).key
+
+@pytest.mark.parametrize("kwargs", [
+    {"sources": []},
+    {"page_min": 3, "page_max": 2},
+    {"ingested_after": 2.0, "ingested_before": 1.0},
+])
+def test_invalid_filters(kwargs):
+    with pytest.raises(FilterError):
+        MetadataFilter(**kwargs)
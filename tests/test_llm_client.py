@@ -0,0 +1,144 @@
+# tests/test_llm_client.py
+import threading
+import time
+import pytest
+from core.config import GenerationLLMConfig, StubLLMConfig
+from core.llm_client import LLMBackend, LLMClient, LLMOverloadedError, LLMTimeoutError, StubBackend
+
+class GatedBackend(LLMBackend):
+    """Streams `tokens` once `gate` opens, counting calls and noticing cancellation."""
+    name = "gated"
+
+    def __init__(self, tokens=("a", " b", " c")):
+        self.tokens = list(tokens)
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.stopped = threading.Event()
+        self.calls = 0
+
+    def stream(self, prompt, cancelled):
+        self.calls += 1
+        self.started.set()
+        try:
+            while not self.gate.wait(0.01):
+                if cancelled():
+                    return
+            for token in self.tokens:
+                if cancelled():
+                    return
+                yield token
+        finally:
+            self.stopped.set()
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+@pytest.fixture
+def backend():
+    return GatedBackend()
+
+@pytest.fixture
+def client(backend):
+    llm_client = LLMClient(backend, max_concurrency=2, max_pending=2, timeout_seconds=5)
+    yield llm_client
+    backend.gate.set()
+    llm_client.close()
+
+def test_identical_prompts_share_one_generation(client, backend):
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(client.invoke("same prompt"))) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    wait_for(lambda: client.stats()["coalesced"] == 2)
+    backend.gate.set()
+    for reader in readers:
+        reader.join(5)
+
+    assert results == ["a b c"] * 3
+    assert backend.calls == 1
+    stats = client.stats()
+    assert stats["generations"] == 1 and stats["coalesced"] == 2 and stats["in_flight"] == 0
+
+def test_max_pending_rejects_new_prompts(client, backend):
+    streams = [client.stream(f"prompt {i}") for i in range(2)]
+    for stream in streams:
+        threading.Thread(target=lambda s=stream: list(s)).start()
+    wait_for(lambda: client.stats()["in_flight"] == 2)
+    with pytest.raises(LLMOverloadedError):
+        next(client.stream("one too many"))
+    assert client.stats()["rejected"] == 1
+
+def test_generation_is_cancelled_once_every_reader_stops(client, backend):
+    cancel = threading.Event()
+    stream = client.stream("prompt", cancelled=cancel.is_set)
+    reader = threading.Thread(target=lambda: list(stream))
+    reader.start()
+    backend.started.wait(1)
+
+    cancel.set()  # e.g. the client disconnected while waiting for the first token
+    reader.join(1)
+    assert not reader.is_alive()
+    assert backend.stopped.wait(1)
+    assert client.stats()["cancelled"] == 1
+    # The prompt starts a fresh generation afterwards
+    backend.gate.set()
+    assert client.invoke("prompt") == "a b c"
+    assert backend.calls == 2
+
+def test_one_reader_leaving_does_not_cancel_the_others(client, backend):
+    cancel = threading.Event()
+    leaving = threading.Thread(target=lambda: list(client.stream("prompt", cancelled=cancel.is_set)))
+    leaving.start()
+    backend.started.wait(1)
+    result = []
+    staying = threading.Thread(target=lambda: result.append(client.invoke("prompt")))
+    staying.start()
+    wait_for(lambda: client.stats()["coalesced"] == 1)
+
+    cancel.set()
+    leaving.join(1)
+    backend.gate.set()
+    staying.join(5)
+    assert result == ["a b c"] and client.stats()["cancelled"] == 0
+
+def test_timeout(backend):
+    llm_client = LLMClient(backend, max_concurrency=1, max_pending=1, timeout_seconds=0.1)
+    try:
+        with pytest.raises(LLMTimeoutError):
+            llm_client.invoke("prompt")
+        assert backend.stopped.wait(1)
+        assert llm_client.stats()["timeouts"] == 1 and llm_client.stats()["cancelled"] == 1
+    finally:
+        llm_client.close()
+
+class SlowBackend(LLMBackend):
+    """Streams a token every `interval` seconds."""
+    name = "slow"
+
+    def __init__(self, tokens, interval):
+        self.tokens, self.interval = tokens, interval
+
+    def stream(self, prompt, cancelled):
+        for token in self.tokens:
+            time.sleep(self.interval)
+            yield token
+
+def test_timeout_is_between_tokens_not_per_generation():
+    # 10 tokens 50 ms apart take longer than the 0.2 s timeout, but no gap does
+    llm_client = LLMClient(SlowBackend(["t"] * 10, 0.05), max_concurrency=1, max_pending=1, timeout_seconds=0.2)
+    try:
+        assert llm_client.invoke("prompt") == "t" * 10
+        assert llm_client.stats()["timeouts"] == 0
+    finally:
+        llm_client.close()
+
+def test_stub_backend_stops_waiting_for_the_first_token_when_cancelled():
+    llm_config = GenerationLLMConfig(provider="stub", stub=StubLLMConfig(ttft_ms=5000))
+    cancelled = threading.Event()
+    threading.Timer(0.05, cancelled.set).start()
+    start = time.monotonic()
+    assert list(StubBackend(llm_config).stream("prompt", cancelled.is_set)) == []
+    assert time.monotonic() - start < 1
@@ -0,0 +1,95 @@
+# tests/test_manifest.py
+import os
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from core.ingestion_service import CHUNK_OVERLAP, CHUNK_SIZE, IngestionService
+from core.manifest import IngestionManifest, ingestion_settings
+from data_access.numpy_vector_store import NumpyVectorStore
+
+def write(path, sentence, repeat=60):
+    with open(path, "w") as f:
+        f.write(" ".join(f"{sentence} {i}." for i in range(repeat)))
+
+def make_service(store_config, monkeypatch):
+    monkeypatch.setattr(store_config.ingestion, "workers", 1)
+    store = NumpyVectorStore(DeterministicFakeEmbedding(size=16))
+    return IngestionService(store), store
+
+def test_manifest_round_trip_and_settings(store_config, tmp_path):
+    settings = ingestion_settings(CHUNK_SIZE, CHUNK_OVERLAP)
+    manifest = IngestionManifest(tmp_path / "m.json", settings=settings)
+    assert not manifest.exists and not manifest.settings_changed
+    manifest.update("a.txt", "hash", ["id1", "id2"])
+    manifest.save()
+
+    reopened = IngestionManifest(tmp_path / "m.json", settings=settings)
+    assert reopened.get("a.txt") == {"sha256": "hash", "chunks": ["id1", "id2"]}
+    assert not reopened.settings_changed
+    assert reopened.remove("a.txt") == ["id1", "id2"] and reopened.remove("a.txt") == []
+    assert IngestionManifest(tmp_path / "m.json", settings={**settings, "chunk_size": 1}).settings_changed
+
+def test_unchanged_files_are_skipped(store_config, tmp_path, monkeypatch):
+    service, store = make_service(store_config, monkeypatch)
+    directory = tmp_path / "files"
+    directory.mkdir()
+    for name in ("a", "b"):
+        write(directory / f"{name}.txt", f"document {name}")
+
+    first = service.ingest_directory(str(directory))
+    assert sorted(first["ingested"]) == ["a.txt", "b.txt"] and first["added"] == store.count() > 0
+
+    # The same directory spelled differently is the same files
+    second = service.ingest_directory(os.path.relpath(directory) + "/")
+    assert sorted(second["skipped"]) == ["a.txt", "b.txt"]
+    assert second["added"] == second["deleted"] == 0 and not second["removed"]
+    assert store.count() == first["added"]
+
+def test_changed_file_only_replaces_its_changed_chunks(store_config, tmp_path, monkeypatch):
+    service, store = make_service(store_config, monkeypatch)
+    directory = tmp_path / "files"
+    directory.mkdir()
+    write(directory / "a.txt", "document a")
+    write(directory / "b.txt", "document b")
+    service.ingest_directory(str(directory))
+    before = IngestionManifest().get(str(directory / "a.txt"))["chunks"]
+
+    with open(directory / "a.txt", "a") as f:
+        f.write(" An extra closing sentence.")
+    report = service.ingest_directory(str(directory))
+    after = IngestionManifest().get(str(directory / "a.txt"))["chunks"]
+
+    assert report["ingested"] == ["a.txt"] and report["skipped"] == ["b.txt"]
+    assert report["added"] == len(set(after) - set(before)) > 0
+    assert report["deleted"] == len(set(before) - set(after))
+    assert len(store.get_by_ids(after)) == len(after)
+    assert not store.get_by_ids(sorted(set(before) - set(after)))
+
+def test_removed_file_chunks_are_deleted(store_config, tmp_path, monkeypatch):
+    service, store = make_service(store_config, monkeypatch)
+    directory = tmp_path / "files"
+    directory.mkdir()
+    write(directory / "a.txt", "document a")
+    write(directory / "b.txt", "document b")
+    service.ingest_directory(str(directory))
+    removed_ids = IngestionManifest().get(str(directory / "b.txt"))["chunks"]
+    total = store.count()
+
+    os.remove(directory / "b.txt")
+    report = service.ingest_directory(str(directory) + os.sep)
+
+    assert report["removed"] == ["b.txt"] and report["deleted"] == len(removed_ids)
+    assert store.count() == total - len(removed_ids)
+    assert not store.get_by_ids(removed_ids)
+    assert IngestionManifest().get(str(directory / "b.txt")) is None
+
+def test_settings_change_reingests_everything(store_config, tmp_path, monkeypatch):
+    service, store = make_service(store_config, monkeypatch)
+    directory = tmp_path / "files"
+    directory.mkdir()
+    write(directory / "a.txt", "document a")
+    first = service.ingest_directory(str(directory))
+
+    monkeypatch.setattr(store_config.inference.embedding, "backend", "onnx")
+    report = service.ingest_directory(str(directory))
+    assert report["ingested"] == ["a.txt"] and report["added"] == first["added"]
+    assert store.count() == first["added"]
+    assert service.ingest_directory(str(directory))["skipped"] == ["a.txt"]
@@ -0,0 +1,98 @@
+# tests/test_numpy_vector_store.py
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from data_access.filters import MetadataFilter
+from data_access.numpy_vector_store import NumpyVectorStore
+
+DIM = 16
+ROWS = 100
+
+@pytest.fixture
+def store_factory(store_config, tmp_path, monkeypatch):
+    # Small blocks so searches span many of them
+    monkeypatch.setattr(store_config.vector_store.numpy, "search_block_rows", 7)
+    return lambda: NumpyVectorStore(DeterministicFakeEmbedding(size=DIM), str(tmp_path / "vectors"))
+
+@pytest.fixture
+def corpus():
+    vectors = np.random.default_rng(0).normal(size=(ROWS, DIM))
+    documents = [Document(page_content=f"chunk {i}", metadata={"source": f"s{i % 3}.txt", "page_number": i}) for i in range(ROWS)]
+    return documents, vectors, [f"id{i}" for i in range(ROWS)]
+
+def brute_force(vectors, live, query, k, metric):
+    """Expected (id, score) pairs: cosine similarity of unit vectors, as squared L2 distance for L2."""
+    units = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarities = units @ (query / np.linalg.norm(query))
+    rows = [row for row in np.argsort(-similarities, kind="stable") if live[row]][:k]
+    return [(f"id{row}", 2 - 2 * similarities[row] if metric == "L2" else similarities[row]) for row in rows]
+
+def assert_same_results(results, expected):
+    assert [doc.metadata["pk"] for doc, _ in results] == [id_ for id_, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+@pytest.mark.parametrize("metric", ["L2", "COSINE"])
+@pytest.mark.parametrize("k", [1, 5, 30, ROWS + 10])
+def test_search_matches_brute_force(store_factory, store_config, corpus, monkeypatch, metric, k):
+    monkeypatch.setattr(store_config, "similarity_metric", metric)
+    documents, vectors, ids = corpus
+    store = store_factory()
+    store.add_embeddings(documents, vectors.tolist(), ids)
+    queries = np.random.default_rng(1).normal(size=(4, DIM))
+
+    live = np.ones(ROWS, dtype=bool)
+    for results, query in zip(store.similarity_search_batch(queries.tolist(), k), queries):
+        assert_same_results(results, brute_force(vectors, live, query, k, metric))
+
+def test_filtered_search(store_factory, corpus):
+    documents, vectors, ids = corpus
+    store = store_factory()
+    store.add_embeddings(documents, vectors.tolist(), ids)
+    search_filter = MetadataFilter(sources=["s1.txt"], page_min=10, page_max=60)
+    query = np.random.default_rng(2).normal(size=DIM)
+
+    results = store.similarity_search_batch([query.tolist()], 50, search_filter)[0]
+    live = np.array([search_filter.matches(doc.metadata) for doc in documents])
+    assert_same_results(results, brute_force(vectors, live, query, 50, "L2"))
+    assert len(results) == live.sum()
+
+def test_delete_compact_and_reopen(store_factory, corpus):
+    documents, vectors, ids = corpus
+    store = store_factory()
+    store.add_embeddings(documents, vectors.tolist(), ids)
+    deleted = ids[::4]
+    store.delete(deleted)
+    assert store.count() == ROWS - len(deleted)
+    assert not store.get_by_ids(deleted)
+
+    live = np.array([id_ not in deleted for id_ in ids])
+    query = np.random.default_rng(3).normal(size=DIM)
+    expected = brute_force(vectors, live, query, 20, "L2")
+    assert_same_results(store.similarity_search_batch([query.tolist()], 20)[0], expected)
+
+    assert store.compact()["dropped_rows"] == len(deleted)
+    assert store.index_stats()["deleted_rows"] == 0
+    assert_same_results(store.similarity_search_batch([query.tolist()], 20)[0], expected)
+
+    # Everything, including the deletes, survives reopening the files
+    reopened = store_factory()
+    assert reopened.count() == ROWS - len(deleted)
+    assert_same_results(reopened.similarity_search_batch([query.tolist()], 20)[0], expected)
+    assert reopened.get_by_ids(["id1"])[0].metadata == {"source": "s1.txt", "page_number": 1, "pk": "id1"}
+
+def test_add_documents_replaces_ids_and_grows(store_factory):
+    store = store_factory()
+    store.add_documents([Document(page_content=f"text {i}") for i in range(3000)], [f"id{i}" for i in range(3000)])
+    store.add_documents([Document(page_content="new text")], ["id0"])
+    assert store.count() == 3000
+    assert store.get_by_ids(["id0"])[0].page_content == "new text"
+    assert store.similarity_search_with_score("new text", 1)[0][0].metadata["pk"] == "id0"
+
+def test_empty_store_and_reset(store_factory, corpus):
+    store = store_factory()
+    assert store.similarity_search_batch([[1.0] * DIM], 5) == [[]]
+    documents, vectors, ids = corpus
+    store.add_embeddings(documents, vectors.tolist(), ids)
+    store.reset()
+    assert store.count() == 0 and store_factory().count() == 0
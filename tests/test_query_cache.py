@@ -0,0 +1,48 @@
+# tests/test_query_cache.py
+from core.query_cache import QueryCache, normalize_query
+
+def make_cache(**overrides):
+    settings = {"max_entries": 10, "max_bytes": 1 << 20, "ttl_seconds": 0, "similarity_threshold": 0.95}
+    return QueryCache(**{**settings, **overrides})
+
+def test_normalize_query():
+    assert normalize_query("  What is  RAG? ") == normalize_query("what is rag") == "what is rag"
+
+def test_exact_and_semantic_hits():
+    cache = make_cache()
+    cache.get("warm up", generation=1)
+    cache.put("What is RAG?", [1.0, 0.0], {"answer": "a"}, generation=1)
+    assert cache.get("what is rag", generation=1) == {"answer": "a"}
+    assert cache.get_similar([0.99, 0.01], generation=1) == {"answer": "a"}
+    assert cache.get_similar([0.0, 1.0], generation=1) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_new_generation_invalidates_every_entry():
+    cache = make_cache()
+    cache.get("q", generation=1)
+    cache.put("q", [1.0, 0.0], {"answer": "old"}, generation=1)
+
+    # Ingestion bumped the vector store generation
+    assert cache.get("q", generation=2) is None
+    assert cache.get_similar([1.0, 0.0], generation=2) is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["invalidations"] == 1
+    assert cache.get("q", generation=1) is None  # Going back does not resurrect entries
+
+def test_results_of_an_older_generation_are_not_cached():
+    cache = make_cache()
+    cache.get("q", generation=2)
+    # Computed before ingestion finished, stored after the cache saw the new generation
+    cache.put("q", [1.0, 0.0], {"answer": "stale"}, generation=1)
+    assert cache.get("q", generation=2) is None and cache.stats()["entries"] == 0
+
+def test_lru_eviction():
+    cache = make_cache(max_entries=2)
+    cache.get("a", generation=1)
+    for name, vector in (("a", [1.0, 0.0, 0.0]), ("b", [0.0, 1.0, 0.0])):
+        cache.put(name, vector, {"answer": name}, generation=1)
+    cache.get("a", generation=1)
+    cache.put("c", [0.0, 0.0, 1.0], {"answer": "c"}, generation=1)
+    assert cache.get("b", generation=1) is None
+    assert cache.get("a", generation=1) == {"answer": "a"}
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,102 @@
+# tests/test_rag_stream.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from core.config import config
+from core.rag_service import QueryOverloadedError, RAGService
+from core.sessions import SessionBusyError, SessionStore
+
+@pytest.fixture
+def service():
+    """A RAGService with only the query pool, enough to drive _aiterate."""
+    rag_service = RAGService.__new__(RAGService)
+    rag_service._executor = ThreadPoolExecutor(max_workers=2)
+    rag_service._pending = 0
+    rag_service._sessions = SessionStore(max_sessions=10, max_bytes=1 << 20, ttl_seconds=0)
+    yield rag_service
+    rag_service._executor.shutdown(wait=True)
+
+def blocking_stream(cancel: threading.Event, closed: threading.Event):
+    """Yields one token, then blocks like a stream waiting on the LLM until cancelled."""
+    try:
+        yield {"type": "token", "text": "first"}
+        cancel.wait(5)
+        if not cancel.is_set():
+            yield {"type": "token", "text": "too late"}
+    finally:
+        closed.set()
+
+def test_aiterate_runs_to_completion(service):
+    async def consume():
+        items = service._aiterate(iter([{"n": 1}, {"n": 2}]), threading.Event(), service._admit()[1])
+        return [item async for item in items]
+
+    assert asyncio.run(consume()) == [{"n": 1}, {"n": 2}]
+    assert service._pending == 0
+
+def test_aiterate_disconnect_between_items(service):
+    cancel, closed = threading.Event(), threading.Event()
+
+    async def consume():
+        items = service._aiterate(blocking_stream(cancel, closed), cancel, service._admit()[1])
+        first = await items.__anext__()
+        assert service._pending == 1
+        await items.aclose()  # The client went away after the first token
+        return first
+
+    assert asyncio.run(consume()) == {"type": "token", "text": "first"}
+    assert cancel.is_set() and closed.wait(1)
+    assert service._pending == 0
+
+def test_aiterate_disconnect_while_a_step_is_running(service):
+    cancel, closed = threading.Event(), threading.Event()
+
+    async def consume():
+        items = service._aiterate(blocking_stream(cancel, closed), cancel, service._admit()[1])
+        await items.__anext__()
+        task = asyncio.ensure_future(items.__anext__())
+        await asyncio.sleep(0.05)  # The next step is now blocked on the pool
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await items.aclose()
+
+    asyncio.run(consume())
+    # The running step saw the cancel and returned, then the generator was closed on its thread
+    assert cancel.is_set() and closed.wait(1)
+    assert service._pending == 0
+
+def test_capacity_is_checked_before_the_stream_starts(service, monkeypatch):
+    monkeypatch.setattr(config.query, "max_pending", 1)
+    service._pending = 1
+    with pytest.raises(QueryOverloadedError):
+        service.astream_answer("question")
+    with pytest.raises(QueryOverloadedError):
+        service.aanswer_queries(["question"])
+    assert service._pending == 1
+
+def test_a_burst_is_counted_at_admission(service, monkeypatch):
+    monkeypatch.setattr(config.query, "max_pending", 2)
+    # None of these streams has been iterated yet, they still hold their slots
+    streams = [service.aanswer_queries([f"question {i}"]) for i in range(2)]
+    with pytest.raises(QueryOverloadedError):
+        service.aanswer_queries(["one too many"])
+    assert service._pending == 2
+
+    # A stream that is never started is released by its release function, once
+    for _, release in streams:
+        release()
+        release()
+    assert service._pending == 0
+
+def test_a_session_streams_one_turn_at_a_time(service):
+    _, release = service.astream_answer("question", session_id="s1")
+    with pytest.raises(SessionBusyError):
+        service.astream_answer("follow-up", session_id="s1")
+    assert service._pending == 1  # The rejected turn took no slot
+
+    release()
+    _, release = service.astream_answer("follow-up", session_id="s1")
+    release()
+    assert service._pending == 0
@@ -0,0 +1,40 @@
+# tests/test_rerank_cascade.py
+import pytest
+from langchain_core.documents import Document
+from core.config import config
+from core.rag_service import RAGService
+
+def candidates(scores):
+    return [(Document(page_content=f"chunk {i}"), score) for i, score in enumerate(scores)]
+
+@pytest.fixture
+def service(monkeypatch):
+    rag_service = RAGService.__new__(RAGService)
+    rag_service._lexical_index = None
+    monkeypatch.setattr(config, "top_k_ranking", 2)
+    monkeypatch.setattr(config, "similarity_metric", "COSINE")
+    monkeypatch.setattr(config.reranker.cascade, "enabled", True)
+    monkeypatch.setattr(config.reranker.cascade, "prune_keep", 3)
+    monkeypatch.setattr(config.reranker.cascade, "early_exit_margin", 0.5)
+    return rag_service
+
+def test_cascade_is_a_pass_through_by_default(service, monkeypatch):
+    monkeypatch.setattr(config.reranker.cascade, "enabled", False)
+    docs = candidates([0.9, 0.8, 0.1, 0.05, 0.0])
+    assert service._cheap_stage(docs) == (docs, "full")
+
+def test_margin_uses_vector_scores_in_score_order():
+    # Fused order differs from vector order; the margin must not depend on it
+    assert RAGService._vector_margin(candidates([0.1, 0.9, None, 0.8, 0.0]), 2) == pytest.approx(0.7 / 0.9)
+    assert RAGService._vector_margin(candidates([0.9, None, 0.8]), 2) == 0.0
+
+def test_early_exit_and_pruning(service):
+    assert service._cheap_stage(candidates([0.9, 0.8, 0.1, 0.05, 0.0]))[1] == "early_exit"
+    docs = candidates([0.9, 0.8, 0.75, 0.7, 0.0])
+    assert service._cheap_stage(docs) == (docs[:3], "pruned")
+
+def test_no_early_exit_for_hybrid_candidates(service, monkeypatch):
+    service._lexical_index = object()
+    monkeypatch.setattr(config.hybrid_search, "enabled", True)
+    docs = candidates([0.9, 0.8, 0.1, 0.05, 0.0])
+    assert service._cheap_stage(docs) == (docs[:3], "pruned")
@@ -0,0 +1,25 @@
+# tests/test_sessions.py
+import pytest
+from core.sessions import SessionBusyError, SessionStore
+
+@pytest.fixture
+def store():
+    return SessionStore(max_sessions=10, max_bytes=1 << 20, ttl_seconds=0)
+
+def test_one_turn_per_session_at_a_time(store):
+    session = store.begin_turn("s1")
+    with pytest.raises(SessionBusyError):
+        store.begin_turn("s1")
+    # Other sessions are not affected
+    store.end_turn(store.begin_turn("s2"))
+
+    store.end_turn(session)
+    assert store.begin_turn("s1") is session
+
+def test_expired_session_is_not_replaced_while_answering(store):
+    session = store.begin_turn("s1")
+    store.ttl_seconds = 1e-9
+    with pytest.raises(SessionBusyError):
+        store.begin_turn("s1")
+    store.end_turn(session)
+    assert store.begin_turn("s1") is not session
@@ -0,0 +1,55 @@
+# tests/test_uploads.py
+import asyncio
+import os
+import pytest
+from api.uploads import UploadError, UploadReceiver, UploadTooLargeError
+from core.ingestion_jobs import IngestionJobQueue, IngestionQueueFullError
+
+def multipart(*files):
+    parts = b"".join(
+        b"--XX\r\nContent-Disposition: form-data; name=\"files\"; filename=\"" + name.encode() + b"\"\r\n"
+        b"Content-Type: application/octet-stream\r\n\r\n" + content + b"\r\n"
+        for name, content in files
+    )
+    return parts + b"--XX--\r\n"
+
+async def chunks(body, size=1000):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+def receiver(directory, max_file_bytes=1 << 20):
+    return UploadReceiver("multipart/form-data; boundary=XX", str(directory), "test", max_file_bytes, [".txt", ".pdf"])
+
+def test_files_are_staged_then_committed(tmp_path):
+    upload = receiver(tmp_path)
+    paths = asyncio.run(upload.receive(chunks(multipart(("a.txt", b"a" * 5000), ("b.txt", b"b"), ("a.txt", b"new")))))
+    assert paths == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert not os.path.exists(paths[0])  # Nothing is in place before commit()
+
+    upload.commit()
+    assert (tmp_path / "a.txt").read_bytes() == b"new" and (tmp_path / "b.txt").read_bytes() == b"b"
+    assert os.listdir(tmp_path / ".uploads") == []
+
+@pytest.mark.parametrize("body, error", [
+    (multipart(("a.exe", b"x")), UploadError),
+    (multipart(("a.txt", b"x" * 200)), UploadTooLargeError),
+    (multipart(("a.txt", b"x"))[:-20], UploadError),
+])
+def test_rejected_uploads_leave_nothing_behind(tmp_path, body, error):
+    with pytest.raises(error):
+        asyncio.run(receiver(tmp_path, max_file_bytes=100).receive(chunks(body, 7)))
+    assert [name for name in os.listdir(tmp_path) if name != ".uploads"] == []
+    staged = tmp_path / ".uploads"
+    assert not staged.exists() or not os.listdir(staged)
+
+def test_full_queue_leaves_the_directory_untouched(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"previous version")
+    upload = receiver(tmp_path)
+    paths = asyncio.run(upload.receive(chunks(multipart(("a.txt", b"uploaded")))))
+    jobs = IngestionJobQueue(lambda: None, max_queued=0, history=10)
+    with pytest.raises(IngestionQueueFullError):
+        jobs.submit_files(paths, before_queue=upload.commit)
+    upload.discard()
+
+    assert (tmp_path / "a.txt").read_bytes() == b"previous version"
+    assert os.listdir(tmp_path / ".uploads") == []